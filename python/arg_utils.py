@@ -13,6 +13,11 @@ def create_parser(
         , default_out='default_output.xlsx'
         , default_corrrate='0.5'
         , default_analysis='default_analysis.xlsx'
+        , default_workers=1
+        , default_index='default_index.db'
+        , default_skip_report='default_skipped.txt'
+        , default_summary='default_filtered_summary.xlsx'
+        , default_backend='pypdf'
     ):
     """
     Create a parser of program arguments
@@ -21,16 +26,89 @@ def create_parser(
                 prog='PDF Extractor',
                 description='Extract PDF content'
             )
-    parser.add_argument('stage', choices=['all', 'extract', 'filter', 'count', 'analyse']) 
+    parser.add_argument('stage', choices=['all', 'extract', 'filter', 'count', 'analyse', 'index']) 
     parser.add_argument('-p', '--pdf') 
     parser.add_argument('-e', '--ext', default=default_extract)
     parser.add_argument('-a', '--authors', default=None)
     parser.add_argument('-f', '--filter', default=default_filter)
+    parser.add_argument('--summary', default=default_summary)
     parser.add_argument('-x', '--exclude', default=default_exclude)
     parser.add_argument('-c', '--corrrate', default=default_corrrate)
     parser.add_argument('-o', '--out', default=default_out)
     parser.add_argument('-l', '--analysis', default=default_analysis)
     parser.add_argument('-op', '--operator', default=default_operator, choices=['and', 'or'])
+    parser.add_argument('-w', '--workers', default=default_workers, type=int)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--rebuild-cache', action='store_true')
+    parser.add_argument('-q', '--queries', default=None)
+    parser.add_argument('--combined', action='store_true')
+    parser.add_argument('-i', '--index', default=default_index)
+    parser.add_argument('--add', default=None)
+    parser.add_argument('--remove', default=None)
+    parser.add_argument('--watch', action='store_true')
+    parser.add_argument('--export', action='store_true')
+    parser.add_argument('--timeout', default=None, type=float)
+    parser.add_argument('--max-pages', default=None, type=int)
+    parser.add_argument('--max-memory', default=None, type=int)
+    parser.add_argument('--retry-pages', default=None, type=int)
+    parser.add_argument('--skip-report', default=default_skip_report)
+    parser.add_argument('--backend', default=default_backend, choices=['pypdf', 'pypdf-upright', 'pymupdf'])
+    parser.add_argument('--first-pages', default=None, type=int)
+    parser.add_argument('--skip-references', action='store_true')
+    parser.add_argument('--manifest', default=None)
+    parser.add_argument('--top-k', default=None, type=int)
+    parser.add_argument('--min-occurrence', default=None, type=int)
+    parser.add_argument('--min-files', default=None, type=int)
+    parser.add_argument('--sample-files', default=None, type=int)
+    parser.add_argument('--rescan', action='store_true')
+    parser.add_argument('--format', default=None, choices=['xlsx', 'csv', 'parquet', 'jsonl', 'feather'])
+    parser.add_argument('--metrics', default=None)
+    parser.add_argument('--profile', default=None)
+    return parser
+
+def create_service_parser(
+        default_host='127.0.0.1'
+        , default_port=8765
+        , default_workers=2
+        , default_queue_size=8
+    ):
+    """
+    Create a parser of service arguments
+    """
+    parser = argparse.ArgumentParser(
+                prog='PDF Extractor Service',
+                description='Run PDF Extractor jobs in warm worker processes'
+            )
+    parser.add_argument('--host', default=default_host)
+    parser.add_argument('--port', default=default_port, type=int)
+    parser.add_argument('--socket', default=None)
+    parser.add_argument('-w', '--workers', default=default_workers, type=int)
+    parser.add_argument('--queue-size', default=default_queue_size, type=int)
+    return parser
+
+def create_benchmark_parser(
+        default_out='benchmark.json'
+        , default_sizes='10,50,200'
+    ):
+    """
+    Create a parser of benchmark arguments
+    """
+    parser = argparse.ArgumentParser(
+                prog='PDF Extractor Benchmark',
+                description='Benchmark the stages over synthetic PDF files'
+            )
+    parser.add_argument('-o', '--out', default=default_out)
+    parser.add_argument('-s', '--sizes', default=default_sizes)
+    parser.add_argument('--pages', default=5, type=int)
+    parser.add_argument('--sentences', default=20, type=int)
+    parser.add_argument('--vocabulary', default=2000, type=int)
+    parser.add_argument('--citation-density', default=0.3, type=float)
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('-c', '--corrrate', default='0.5')
+    parser.add_argument('--no-pdf', action='store_true')
+    parser.add_argument('--backend', default='pypdf', choices=['pypdf', 'pypdf-upright', 'pymupdf'])
+    parser.add_argument('--work-dir', default=None)
+    parser.add_argument('--compare', default=None)
     return parser
 
 def usage(parser):
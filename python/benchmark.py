@@ -0,0 +1,239 @@
+"""
+PDF Extractor Benchmark Program
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import arg_utils
+import file_utils
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import tracemalloc
+
+# Authors cited by the synthetic sentences, where the first one is filtered by the benchmark
+AUTHOR_LIST = ['smith', 'jones', 'taylor', 'brown', 'wilson', 'chen', 'garcia', 'kim']
+
+def make_pdf(pdf_path, page_list):
+    """
+    Write a minimal PDF file with a page of Helvetica text for each given text, without any PDF library
+    """
+    obj_list = list()
+    def add_obj(obj):
+        obj_list.append(obj)
+        return len(obj_list)
+    font_id = add_obj(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    # Pages object comes after the contents and the pages
+    pages_id = len(obj_list) + 2 * len(page_list) + 1
+    page_id_list = list()
+    for text in page_list:
+        line_list = [line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+                     for line in textwrap.wrap(text, 90)]
+        stream = 'BT /F1 10 Tf 50 750 Td 12 TL {l} ET'.format(l=' '.join("({t}) '".format(t=line) for line in line_list)).encode('latin-1')
+        content_id = add_obj(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        page_id_list.append(add_obj(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R '
+                                    b'/Resources << /Font << /F1 %d 0 R >> >> >>' % (pages_id, content_id, font_id)))
+    add_obj(b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % page_id for page_id in page_id_list), len(page_id_list)))
+    catalog_id = add_obj(b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+
+    content = b'%PDF-1.4\n'
+    offset_list = list()
+    for obj_id, obj in enumerate(obj_list, 1):
+        offset_list.append(len(content))
+        content += b'%d 0 obj\n' % obj_id + obj + b'\nendobj\n'
+    xref_offset = len(content)
+    content += b'xref\n0 %d\n0000000000 65535 f \n' % (len(obj_list) + 1)
+    content += b''.join(b'%010d 00000 n \n' % offset for offset in offset_list)
+    content += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(obj_list) + 1, catalog_id, xref_offset)
+    with open(pdf_path, 'wb') as fw:
+        fw.write(content)
+
+def make_vocabulary(vocabulary_size, rng):
+    """
+    Make the given number of distinct lowercase words from random syllables
+    """
+    syllable_list = [consonant + vowel for consonant in 'bcdfghklmnprstvz' for vowel in 'aeiou']
+    word_set = set()
+    while len(word_set) < vocabulary_size:
+        word_set.add(''.join(rng.choice(syllable_list) for _ in range(rng.randint(1, 4))))
+    return sorted(word_set)
+
+def make_sentence(rng, vocabulary, citation_density):
+    """
+    Make a sentence of random words, which cites authors in either citation style by the given density
+    """
+    word_list = [rng.choice(vocabulary) for _ in range(rng.randint(6, 18))]
+    word_list[0] = word_list[0].capitalize()
+    sentence = ' '.join(word_list)
+    if rng.random() < citation_density:
+        if rng.random() < 0.5:
+            sentence = '{s} by {a} ({y})'.format(s=sentence, a=rng.choice(AUTHOR_LIST).capitalize(), y=rng.randint(1990, 2024))
+        else:
+            author_list = rng.sample(AUTHOR_LIST, rng.randint(1, 3))
+            sentence = '{s} ({c})'.format(s=sentence, c='; '.join('{a}, {y}'.format(a=author.capitalize(), y=rng.randint(1990, 2024))
+                                                              for author in author_list))
+    return sentence + '.'
+
+def make_corpus(corpus_dir, files, pages=5, sentences=20, vocabulary_size=2000, citation_density=0.3, seed=0, with_pdf=True):
+    """
+    Make synthetic PDF files of the given number of pages of sentences each, and the TSV extract of their text
+    Return the paths of the PDF files and the path of the extract
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    os.makedirs(corpus_dir, exist_ok=True)
+    pdf_path_list = list()
+    file_tokens = list()
+    for file_idx in range(files):
+        page_list = [' '.join(make_sentence(rng, vocabulary, citation_density) for _ in range(sentences))
+                     for _ in range(pages)]
+        pdf_path = os.path.join(corpus_dir, 'synthetic_{i:05d}.pdf'.format(i=file_idx))
+        if with_pdf:
+            make_pdf(pdf_path, page_list)
+            pdf_path_list.append(pdf_path)
+        file_tokens.append((os.path.basename(pdf_path), ' '.join(page_list).replace('. ', '.\n').split('\n')))
+    extract_path = os.path.join(corpus_dir, 'extracted.txt')
+    file_utils.write_output_extract(file_tokens, extract_path)
+    return pdf_path_list, extract_path
+
+def measure(func, *args):
+    """
+    Run the function for its time, then run it again traced for its peak memory of Python allocations
+    Return the result, the seconds and the peak memory in bytes
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func(*args)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak_memory
+
+def get_commit():
+    """
+    Get the git commit of the source, or None outside of a git repository
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmark(files, work_dir, config_dict, pages=5, sentences=20, vocabulary_size=2000, citation_density=0.3,
+                  seed=0, min_corr_rate=0.5, with_pdf=True, backend='pypdf'):
+    """
+    Time each stage entry point over a synthetic corpus of the given number of files
+    Return a result of each stage with its seconds, throughput and peak memory
+    """
+    import lang_utils
+    import stat_utils
+    corpus_dir = os.path.join(work_dir, 'files_{n}'.format(n=files))
+    pdf_path_list, extract_path = make_corpus(corpus_dir, files, pages, sentences, vocabulary_size, citation_density, seed, with_pdf)
+    text_pair_list = file_utils.read_text_file(extract_path)
+    result_list = list()
+    def add_result(stage, seconds, peak_memory, items, unit):
+        result_list.append({
+            'stage': stage
+            , 'files': files
+            , 'items': items
+            , 'unit': unit
+            , 'seconds': seconds
+            , 'throughput': items / seconds if seconds > 0 else None
+            , 'peak_memory_bytes': peak_memory
+        })
+
+    if with_pdf:
+        extract_options = lang_utils.get_extract_options(backend)
+        path_tokens, seconds, peak_memory = measure(lang_utils.get_path_tokens, pdf_path_list, 1, None, False, None, None, extract_options)
+        add_result('extract', seconds, peak_memory, files * pages, 'pages')
+
+    filtered_pair, seconds, peak_memory = measure(lang_utils.filter_citation, text_pair_list, AUTHOR_LIST[0], 'or',
+                                                  config_dict['unnamed_patterns'], config_dict['named_patterns'], config_dict['named_year_patterns'])
+    add_result('filter', seconds, peak_memory, len(text_pair_list), 'sentences')
+
+    def filter_summary(text_pair_list):
+        citation_list = lang_utils.scan_citation(text_pair_list, AUTHOR_LIST[0], 'or',
+                                                 config_dict['unnamed_patterns'], config_dict['named_patterns'], config_dict['named_year_patterns'])
+        stat_utils.write_excel_filter_summary(citation_list, os.path.join(corpus_dir, 'summary.xlsx'))
+    none_result, seconds, peak_memory = measure(filter_summary, text_pair_list)
+    add_result('filter_summary', seconds, peak_memory, len(text_pair_list), 'sentences')
+
+    def count_words(text_pair_list):
+        return stat_utils.merge_dataframes(lang_utils.get_file_tokens(text_pair_list, []))
+    result_df, seconds, peak_memory = measure(count_words, filtered_pair)
+    add_result('count', seconds, peak_memory, len(filtered_pair), 'sentences')
+
+    pdf_file_list = list(result_df.columns)
+    stat_utils.add_word_summary(result_df, pdf_file_list)
+    paired_df, seconds, peak_memory = measure(stat_utils.analyse_pair, result_df, pdf_file_list, min_corr_rate, filtered_pair)
+    add_result('analyse', seconds, peak_memory, len(result_df), 'words')
+
+    def write_excel(result_df, paired_df):
+        stat_utils.write_word_counts(result_df, os.path.join(corpus_dir, 'output.xlsx'), ['file_count', 'occurrence'], pdf_file_list)
+        stat_utils.write_excel_paired_analysis(paired_df, os.path.join(corpus_dir, 'analysis.xlsx'),
+                                               ['word_1', 'word_2', 'correlation', 'file_count', 'occurrence'], pdf_file_list)
+    none_result, seconds, peak_memory = measure(write_excel, result_df, paired_df)
+    add_result('write_excel', seconds, peak_memory, len(result_df) + len(paired_df), 'rows')
+    return result_list
+
+def compare_results(result_list, baseline_list):
+    """
+    Get the lines comparing the seconds of each stage and size with the baseline
+    """
+    baseline_dict = {(result['stage'], result['files']): result for result in baseline_list}
+    line_list = ['{s:<12}{f:>8}{b:>12}{c:>12}{r:>10}'.format(s='stage', f='files', b='baseline', c='current', r='ratio')]
+    for result in result_list:
+        baseline = baseline_dict.get((result['stage'], result['files']))
+        if baseline is None:
+            continue
+        line_list.append('{s:<12}{f:>8}{b:>12.4f}{c:>12.4f}{r:>10.2f}'.format(
+            s=result['stage'], f=result['files'], b=baseline['seconds'], c=result['seconds'],
+            r=result['seconds'] / baseline['seconds'] if baseline['seconds'] > 0 else float('nan')))
+    return line_list
+
+if __name__ == '__main__':
+    """
+    Benchmark program starts
+    """
+    config_dict = file_utils.read_json('config.json')
+    args = arg_utils.create_benchmark_parser().parse_args()
+    size_list = [int(size) for size in args.sizes.split(',')]
+    work_dir = args.work_dir if args.work_dir is not None else tempfile.mkdtemp(prefix='pdf_extractor_benchmark_')
+
+    result_list = list()
+    try:
+        for files in size_list:
+            result_list.extend(run_benchmark(files, work_dir, config_dict, args.pages, args.sentences, args.vocabulary,
+                                             args.citation_density, args.seed, float(args.corrrate), not args.no_pdf, args.backend))
+            print('Benchmark of {n} files was complete.'.format(n=files))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    file_utils.save_json({
+        'commit': get_commit()
+        , 'python': sys.version.split()[0]
+        , 'platform': platform.platform()
+        , 'parameters': {
+            'sizes': size_list
+            , 'pages': args.pages
+            , 'sentences': args.sentences
+            , 'vocabulary': args.vocabulary
+            , 'citation_density': args.citation_density
+            , 'seed': args.seed
+            , 'corrrate': float(args.corrrate)
+            , 'backend': args.backend
+        }
+        , 'results': result_list
+    }, args.out)
+    print('Benchmark results are saved in {o}.'.format(o=args.out))
+    if args.compare is not None:
+        print('\n'.join(compare_results(result_list, file_utils.read_json(args.compare)['results'])))
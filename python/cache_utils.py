@@ -0,0 +1,91 @@
+"""
+Cache Utilities
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+def get_file_hash(file_path, block_size=1 << 20):
+    """
+    Get the SHA-256 hex digest of the content of the given file
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as fr:
+        for block in iter(lambda: fr.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def get_cache_key(content_hash, settings):
+    """
+    Combine the content hash with the settings which affect the cached result
+    """
+    key_text = json.dumps([content_hash, settings], sort_keys=True)
+    return hashlib.sha256(key_text.encode('utf-8')).hexdigest()
+
+def get_cache_path(cache_dir, cache_key):
+    return os.path.join(cache_dir, cache_key[:2], cache_key + '.json')
+
+def read_cache(cache_dir, cache_key):
+    """
+    Read the cached value of the given key, or None if it is not cached
+    """
+    cache_path = get_cache_path(cache_dir, cache_key)
+    try:
+        with open(cache_path, 'r') as fr:
+            value = json.load(fr)
+    except (OSError, ValueError):
+        return None
+    # Refresh the modified time so that eviction by age keeps entries in use
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return value
+
+def write_cache(cache_dir, cache_key, value):
+    """
+    Write the value of the given key into the cache atomically
+    """
+    cache_path = get_cache_path(cache_dir, cache_key)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = '{p}.{pid}.tmp'.format(p=cache_path, pid=os.getpid())
+    try:
+        with open(temp_path, 'w') as fw:
+            json.dump(value, fw)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        logging.exception('Failed to write cache {cp}'.format(cp=cache_path))
+
+def evict_cache(cache_dir, max_size_mb=None, max_age_days=None):
+    """
+    Remove cache entries older than the max age, then remove the least recently
+    used entries until the total size is within the max size
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    entry_list = list()
+    for root, dirs, files in os.walk(cache_dir):
+        for file in files:
+            if file.endswith('.json'):
+                full_path = os.path.join(root, file)
+                stat = os.stat(full_path)
+                entry_list.append((stat.st_mtime, stat.st_size, full_path))
+    entry_list.sort()
+
+    now = time.time()
+    total_size = sum(entry[1] for entry in entry_list)
+    max_size = None if max_size_mb is None else max_size_mb * 1024 * 1024
+    for mtime, size, full_path in entry_list:
+        is_expired = max_age_days is not None and now - mtime > max_age_days * 86400
+        is_oversize = max_size is not None and total_size > max_size
+        if not is_expired and not is_oversize:
+            break
+        try:
+            os.remove(full_path)
+            total_size -= size
+        except OSError:
+            logging.exception('Failed to evict cache {cp}'.format(cp=full_path))
@@ -0,0 +1,191 @@
+"""
+Citation Utilities
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+from collections import namedtuple
+import metric_utils
+import re
+
+# A match of an unnamed pattern in a sentence, with the number of citations in it
+CitationMatch = namedtuple('CitationMatch', ['pattern', 'start', 'end', 'citations'])
+
+# Separators of the citations in a match
+CITATION_SEP_RE = re.compile(r',|and')
+
+# Characters which make an author name a regular expression rather than a literal
+REGEX_META_CHARS = re.compile(r'[\\.^$*+?{}\[\]|()]')
+
+def merge_patterns(ptn_list):
+    """
+    Compile the given patterns into a single alternation, or None if there is no pattern
+    """
+    if len(ptn_list) == 0:
+        return None
+    return re.compile('|'.join('(?:{p})'.format(p=ptn) for ptn in ptn_list))
+
+def get_author_patterns(author, named_ptn_list, named_year_ptn_list):
+    """
+    Get the author name and the named patterns of an author, given as 'name' or 'name-year'
+    """
+    if '-' in author:
+        [author_name, year] = author.split('-', 1)
+        ptn_list = [ named_year_ptn.replace('$name', author_name).replace('$year', year) for named_year_ptn in named_year_ptn_list ]
+    else:
+        author_name = author
+        ptn_list = [ named_ptn.replace('$name', author) for named_ptn in named_ptn_list ]
+    return author_name, ptn_list
+
+def count_citations(citation_text):
+    """
+    Count the citations in the text matched by an unnamed pattern, excluding examples by 'e.g.'
+    """
+    return len([n for n in CITATION_SEP_RE.sub(';', citation_text).split(';')
+                if len(n.strip()) > 0 and
+                   not n.strip().startswith('e.g.') and not n.strip().endswith('e.g.')])
+
+def get_name_check(name):
+    """
+    Get the check of an author name in a sentence, by substring if the name is literal, or by its regex
+    """
+    return (name, None if REGEX_META_CHARS.search(name) is None else re.compile(name))
+
+def is_name_in(name_check, lower_line):
+    name, name_re = name_check
+    return (name in lower_line) if name_re is None else (name_re.search(lower_line) is not None)
+
+def get_name_prefilter(name_list, named_ptn_list, named_year_ptn_list):
+    """
+    Get the regex of any author name and the name check of each author, which prefilter sentences by author names
+    Both are None unless every named pattern contains the name
+    """
+    if not all('$name' in ptn for ptn in named_ptn_list + named_year_ptn_list):
+        return None, None
+    # Literal names are checked by substring, others by their own regex
+    return merge_patterns(name_list), [get_name_check(name) for name in name_list]
+
+def find_citations(unamed_re_list, text_line, match_list=None):
+    """
+    Get the first citation of each matched unnamed pattern in the sentence, in lowercase, where authors are searched
+    Every match is appended into match_list as CitationMatch if it is given
+    """
+    citation_list = list()
+    for ptn_idx, unamed_re in enumerate(unamed_re_list):
+        if match_list is None:
+            matched = unamed_re.search(text_line)
+            if matched:
+                citation_list.append(matched.group().lower())
+            continue
+        for match_idx, matched in enumerate(unamed_re.finditer(text_line)):
+            citation_text = matched.group()
+            if match_idx == 0:
+                citation_list.append(citation_text.lower())
+            match_list.append(CitationMatch(ptn_idx, matched.start(), matched.end(), count_citations(citation_text)))
+    return citation_list
+
+class QueryMatcher:
+    """
+    Matcher of citation sentences for many queries at once, each as a tuple of an author list and an operator
+    Every author is searched once per sentence, however many queries share the author
+    """
+    def __init__(self, query_list, unamed_ptn_list, named_ptn_list=[], named_year_ptn_list=[]):
+        self.timing_dict = None
+        self.unamed_re_list = [re.compile(ptn) for ptn in unamed_ptn_list]
+        self.operator_list = [operator for author_list, operator in query_list]
+        # Number of distinct authors of each query
+        self.query_size_list = list()
+
+        # Distinct authors of all queries, each with its patterns and its queries
+        author_pos_dict = dict()
+        name_list = list()
+        self.author_info_list = list()
+        for query_idx, (author_list, operator) in enumerate(query_list):
+            distinct_author_list = list(dict.fromkeys(author_list))
+            for author in distinct_author_list:
+                if author not in author_pos_dict:
+                    author_name, author_ptn_list = get_author_patterns(author, named_ptn_list, named_year_ptn_list)
+                    author_pos_dict[author] = len(self.author_info_list)
+                    name_list.append(author_name)
+                    self.author_info_list.append((author, merge_patterns(author_ptn_list), list()))
+                self.author_info_list[author_pos_dict[author]][2].append(query_idx)
+            self.query_size_list.append(len(distinct_author_list))
+        self.name_re, self.name_check_list = get_name_prefilter(name_list, named_ptn_list, named_year_ptn_list)
+
+    def scan_queries(self, text_line, match_list=None):
+        """
+        Get the indices of the queries which the given sentence matches, or None if it is not citation
+        Every match of the unnamed patterns is appended into match_list as CitationMatch if it is given
+        """
+        lower_line = text_line.lower()
+        if self.name_re is not None and self.name_re.search(lower_line) is None:
+            # None of the authors is mentioned
+            return []
+        citation_list = find_citations(self.unamed_re_list, text_line, match_list)
+        if len(citation_list) == 0:
+            return None
+
+        # Count the cited authors of each query
+        cited_count_dict = dict()
+        for author_idx, (author, author_re, query_idx_list) in enumerate(self.author_info_list):
+            if self.name_check_list is not None and not is_name_in(self.name_check_list[author_idx], lower_line):
+                continue
+            if author_re is not None and any(author_re.search(citation) for citation in citation_list):
+                for query_idx in query_idx_list:
+                    cited_count_dict[query_idx] = cited_count_dict.get(query_idx, 0) + 1
+        return [query_idx for query_idx, cited_count in sorted(cited_count_dict.items())
+                if self.operator_list[query_idx] == 'or' or cited_count == self.query_size_list[query_idx]]
+
+    def match(self, text_line):
+        """
+        Get the indices of the queries which the given sentence matches
+        """
+        return self.scan_queries(text_line) or []
+
+    def enable_timing(self):
+        """
+        Time the searches of each pattern, which are collected by pop_timing
+        """
+        self.timing_dict = dict()
+        def timed(pattern, label):
+            return None if pattern is None else metric_utils.TimedPattern(pattern, label, self.timing_dict)
+        self.unamed_re_list = [timed(unamed_re, 'unnamed_{i}'.format(i=idx)) for idx, unamed_re in enumerate(self.unamed_re_list)]
+        self.author_info_list = [(author, timed(author_re, 'author_{a}'.format(a=author)), query_idx_list)
+                                 for author, author_re, query_idx_list in self.author_info_list]
+        self.name_re = timed(self.name_re, 'author_names')
+
+    def pop_timing(self):
+        """
+        Get the [seconds, evaluations] of each pattern since the last call, or None if timing is not enabled
+        """
+        if self.timing_dict is None:
+            return None
+        timing_dict = {label: list(timing) for label, timing in self.timing_dict.items()}
+        self.timing_dict.clear()
+        return timing_dict
+
+class CitationMatcher(QueryMatcher):
+    """
+    Matcher of citation sentences, compiled once from the patterns and the authors, as a matcher of a single query
+    """
+    def __init__(self, unamed_ptn_list, named_ptn_list=[], named_year_ptn_list=[],
+                 author_list=None, operator='or'):
+        query_list = [] if author_list is None else [(author_list, operator)]
+        super().__init__(query_list, unamed_ptn_list, named_ptn_list, named_year_ptn_list)
+        self.author_list = author_list
+
+    def scan(self, text_line):
+        """
+        Scan the given sentence for citations, with the given authors if any
+        Return the list of CitationMatch of all unnamed patterns, or None if it is not citation
+        """
+        match_list = list()
+        query_idx_list = self.scan_queries(text_line, match_list)
+        if query_idx_list is None or (self.author_list is not None and len(query_idx_list) == 0):
+            return None
+        return match_list
+
+    def is_citation(self, text_line):
+        """
+        Whether the given sentence is citation, with the given authors if any
+        """
+        return self.scan(text_line) is not None
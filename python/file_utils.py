@@ -4,19 +4,14 @@ File Utilities
 @since      30 Jan 2024
 """
 import json
+import manifest_utils
 import os
 
-def filter_pdf_file(dir):
+def filter_pdf_file(dir, threads=8):
     """
-    List all PDF files in the given directory
+    List all PDF files in the given directory, walking the subdirectories concurrently
     """
-    result = list()
-    for root, dirs, files in os.walk(dir):
-        for file in files:
-            full_path = os.path.join(root, file)
-            if os.path.isfile(full_path) and file.endswith('.pdf'):
-                result.append(full_path)
-    return result
+    return list(manifest_utils.get_file_dict(manifest_utils.scan_tree(dir, threads=threads, with_hash=False), dir))
 
 def get_pdf_files(pdf_path):
     if os.path.isdir(pdf_path):
@@ -26,18 +21,63 @@ def get_pdf_files(pdf_path):
         # The given path is a single file
         return [ pdf_path ]
 
-def write_output_extract(file_tokens_dict, output_path):
+def get_file_name(pdf_path, root_dir=None):
     """
-    Write the result to an output file
+    Get the name of a file by its path relative to the root directory if given, or by its base name
+    """
+    if root_dir is None:
+        return os.path.basename(pdf_path)
+    return os.path.relpath(pdf_path, root_dir).replace(os.sep, '/')
+
+def get_pdf_file_dict(pdf_path, manifest_path=None, threads=8, rescan=False):
+    """
+    Get the size, the modified time and the hash, or None if it is not known, of each PDF file of the given path
+    The hashes are kept in the manifest if given, so that only the changed directories are scanned by the next run
+    """
+    if not os.path.isdir(pdf_path):
+        # The given path is a single file
+        stat = os.stat(pdf_path)
+        return {pdf_path: (stat.st_size, stat.st_mtime, None)}
+    if manifest_path is not None:
+        return manifest_utils.update_manifest(pdf_path, manifest_path, threads, rescan)
+    return manifest_utils.get_file_dict(manifest_utils.scan_tree(pdf_path, threads=threads, with_hash=False), pdf_path)
+
+def iter_output_extract(file_tokens, output_path):
+    """
+    Write the result to an output file, yielding each file name and sentence pair once written
+    The result is either a dict or an iterable of file name and text list pairs,
+    which is written file by file as it is produced
     """
+    if isinstance(file_tokens, dict):
+        file_tokens = file_tokens.items()
     with open(output_path, 'w') as fw:
         # Print header
         fw.write('\t'.join(['Filename', 'Sentence']))
         fw.write('\n')
-        for file_name, text_list in file_tokens_dict.items():
+        for file_name, text_list in file_tokens:
             for line in text_list:
                 fw.write('\t'.join([file_name, line]))
-                fw.write('\n')  
+                fw.write('\n')
+                yield [file_name, line]
+
+def write_output_extract(file_tokens, output_path):
+    """
+    Write the result to an output file
+    """
+    for text_pair in iter_output_extract(file_tokens, output_path):
+        pass
+
+def write_skip_report(skip_list, output_path):
+    """
+    Write the files skipped or partially extracted by the limits, with the reasons
+    """
+    with open(output_path, 'w') as fw:
+        # Print header
+        fw.write('\t'.join(['Path', 'Reason']))
+        fw.write('\n')
+        for skip_pair in skip_list:
+            fw.write('\t'.join(skip_pair))
+            fw.write('\n')
 
 def read_text_file(text_file):
     """
@@ -60,6 +100,46 @@ def write_output_filter(text_pair_list, output_path):
             fw.write('\t'.join(line_pair))
             fw.write('\n')
 
+def read_query_file(query_file, default_operator='or'):
+    """
+    Read the queries of a file, each line as comma separated authors optionally followed by an operator
+    Return a list of author list and operator tuples
+    """
+    query_list = list()
+    with open(query_file, 'r') as fr:
+        for line in fr.readlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.rsplit(None, 1)
+            if len(parts) == 2 and parts[1].lower() in ['and', 'or']:
+                authors, operator = parts[0], parts[1].lower()
+            else:
+                authors, operator = line, default_operator
+            query_list.append(([author.strip() for author in authors.lower().split(',')], operator))
+    return query_list
+
+def get_query_output_path(output_path, query_idx):
+    """
+    Get the output path of the query at the given index, numbered from 1
+    """
+    stem, extension = os.path.splitext(output_path)
+    return '{s}_q{n}{e}'.format(s=stem, n=query_idx + 1, e=extension)
+
+def write_output_queries(query_list, filtered_pair_lists, output_path):
+    """
+    Write the results of all queries to a single output file
+    """
+    with open(output_path, 'w') as fw:
+        # Print header
+        fw.write('\t'.join(['Query', 'Filename', 'Sentence']))
+        fw.write('\n')
+        for (author_list, operator), filtered_pair in zip(query_list, filtered_pair_lists):
+            query = '{a} {o}'.format(a=','.join(author_list), o=operator)
+            for line_pair in filtered_pair:
+                fw.write('\t'.join([query] + list(line_pair)))
+                fw.write('\n')
+
 def get_exclude_list(exclude_file):
     """
     Get List of excluded words from a gile
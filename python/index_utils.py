@@ -0,0 +1,222 @@
+"""
+Corpus Index Utilities
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import cache_utils
+import file_utils
+import json
+import lang_utils
+import logging
+import os
+import sqlite3
+import stat_utils
+from collections import Counter
+
+# Increase when the content of the index changes, so that older indexes are rebuilt
+# Version 2 names files by their paths relative to the indexed directory
+INDEX_VERSION = 2
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime REAL, hash TEXT);
+CREATE TABLE IF NOT EXISTS sentences (name TEXT, seq INTEGER, sentence TEXT, PRIMARY KEY (name, seq));
+CREATE TABLE IF NOT EXISTS word_counts (name TEXT, word TEXT, count INTEGER, PRIMARY KEY (name, word));
+CREATE TABLE IF NOT EXISTS pair_counts (name TEXT, word_1 TEXT, word_2 TEXT, count INTEGER, PRIMARY KEY (name, word_1, word_2));
+CREATE TABLE IF NOT EXISTS word_stats (word TEXT PRIMARY KEY, file_count INTEGER, occurrence INTEGER);
+'''
+
+def open_index(index_path, settings):
+    """
+    Open the corpus index, which is cleared if it was built with other settings
+    """
+    conn = sqlite3.connect(index_path)
+    conn.executescript(SCHEMA)
+    settings_text = json.dumps(settings, sort_keys=True)
+    row = conn.execute('SELECT value FROM meta WHERE key = ?', ('settings', )).fetchone()
+    if row is None or row[0] != settings_text:
+        if row is not None:
+            logging.warning('Settings of index {ip} changed, rebuilding the index'.format(ip=index_path))
+        with conn:
+            for table in ['files', 'sentences', 'word_counts', 'pair_counts', 'word_stats']:
+                conn.execute('DELETE FROM {t}'.format(t=table))
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('settings', settings_text))
+    return conn
+
+def get_index_settings(authors, operator, config_dict, exclude_list, extract_options=lang_utils.DEFAULT_EXTRACT_OPTIONS):
+    """
+    Get the settings which affect the content of the index
+    """
+    return {
+        'version': INDEX_VERSION
+        , 'authors': authors
+        , 'operator': operator
+        , 'unnamed_patterns': config_dict['unnamed_patterns']
+        , 'named_patterns': config_dict['named_patterns']
+        , 'named_year_patterns': config_dict['named_year_patterns']
+        , 'exclude': sorted(set(exclude_list))
+        , 'extract': lang_utils.get_extract_settings(extract_options)
+    }
+
+def get_file_entry(text_tokens, matcher, exclude_set):
+    """
+    Get the filtered sentences, the word counts and the pair counts of the text of a file
+    """
+    sentence_list = [sentence for sentence in text_tokens if matcher.is_citation(sentence)]
+    word_counter = Counter()
+    for sentence in sentence_list:
+        word_counter.update(lang_utils.get_word_tokens(sentence, exclude_set))
+    word_list = sorted(word_counter)
+    word_pos_dict = {word: pos for pos, word in enumerate(word_list)}
+    pair_index = stat_utils.build_pair_index([('', sentence) for sentence in sentence_list], word_pos_dict)
+    pair_counter = {(word_list[pair[0]], word_list[pair[1]]): file_occurrence_dict['']
+                    for pair, file_occurrence_dict in pair_index.items()}
+    return sentence_list, word_counter, pair_counter
+
+def add_file(conn, name, path, size, mtime, content_hash, sentence_list, word_counter, pair_counter):
+    """
+    Add the entry of a file, and add its counts into the aggregates
+    """
+    conn.execute('INSERT INTO files (name, path, size, mtime, hash) VALUES (?, ?, ?, ?, ?)',
+                 (name, path, size, mtime, content_hash))
+    conn.executemany('INSERT INTO sentences (name, seq, sentence) VALUES (?, ?, ?)',
+                     [(name, seq, sentence) for seq, sentence in enumerate(sentence_list)])
+    conn.executemany('INSERT INTO word_counts (name, word, count) VALUES (?, ?, ?)',
+                     [(name, word, count) for word, count in word_counter.items()])
+    conn.executemany('INSERT INTO pair_counts (name, word_1, word_2, count) VALUES (?, ?, ?, ?)',
+                     [(name, pair[0], pair[1], count) for pair, count in pair_counter.items()])
+    conn.executemany('INSERT INTO word_stats (word, file_count, occurrence) VALUES (?, 1, ?) '
+                     'ON CONFLICT (word) DO UPDATE SET file_count = file_count + 1, occurrence = occurrence + excluded.occurrence',
+                     list(word_counter.items()))
+
+def remove_file(conn, name):
+    """
+    Remove the entry of a file, and subtract its counts from the aggregates
+    """
+    word_count_list = conn.execute('SELECT word, count FROM word_counts WHERE name = ?', (name, )).fetchall()
+    conn.executemany('UPDATE word_stats SET file_count = file_count - 1, occurrence = occurrence - ? WHERE word = ?',
+                     [(count, word) for word, count in word_count_list])
+    conn.executemany('DELETE FROM word_stats WHERE word = ? AND file_count <= 0',
+                     [(word, ) for word, count in word_count_list])
+    for table in ['files', 'sentences', 'word_counts', 'pair_counts']:
+        conn.execute('DELETE FROM {t} WHERE name = ?'.format(t=table), (name, ))
+
+def remove_files(conn, name_list):
+    with conn:
+        for name in name_list:
+            remove_file(conn, name)
+
+def sync_index(conn, pdf_path_list, matcher, exclude_list, workers=1, cache_dir=None, remove_missing=True, limits=None,
+               extract_options=lang_utils.DEFAULT_EXTRACT_OPTIONS, file_info_dict=None, root_dir=None):
+    """
+    Bring the index up to date with the given PDF files
+    Only new or changed files are extracted, and the files no longer given are removed if remove_missing
+    Files are named by their paths relative to root_dir if given, or by their base names
+    The size, the modified time and the hash of the files in file_info_dict, such as those of the manifest,
+    are taken without reading the files again
+    Files skipped by the limits are not added, so they are tried again by the next update
+    Return the numbers of added, updated and removed files
+    """
+    file_dict = {name: (size, mtime, content_hash) for name, size, mtime, content_hash
+                 in conn.execute('SELECT name, size, mtime, hash FROM files')}
+    changed_path_dict = dict()
+    hash_dict = dict()
+    name_set = set()
+    for pdf_path in pdf_path_list:
+        name = file_utils.get_file_name(pdf_path, root_dir)
+        name_set.add(name)
+        if file_info_dict is not None and pdf_path in file_info_dict:
+            size, mtime, content_hash = file_info_dict[pdf_path]
+        else:
+            try:
+                stat = os.stat(pdf_path)
+            except OSError:
+                logging.exception('Failed to read PDF {pp}'.format(pp=pdf_path))
+                continue
+            size, mtime, content_hash = stat.st_size, stat.st_mtime, None
+        if name in file_dict and file_dict[name][:2] == (size, mtime):
+            continue
+        if content_hash is None:
+            content_hash = cache_utils.get_file_hash(pdf_path)
+        if name in file_dict and file_dict[name][2] == content_hash:
+            # Touched but not changed
+            with conn:
+                conn.execute('UPDATE files SET path = ?, size = ?, mtime = ? WHERE name = ?',
+                             (pdf_path, size, mtime, name))
+            continue
+        changed_path_dict[name] = pdf_path
+        hash_dict[name] = (size, mtime, content_hash)
+
+    removed_list = [name for name in file_dict if name not in name_set] if remove_missing else list()
+    remove_files(conn, removed_list)
+
+    exclude_set = frozenset(exclude_list)
+    added = 0
+    updated = 0
+    for name, text_tokens in lang_utils.iter_path_tokens(list(changed_path_dict.values()), workers, cache_dir, limits=limits,
+                                                         extract_options=extract_options,
+                                                         hash_dict={pdf_path: hash_dict[name][2] for name, pdf_path in changed_path_dict.items()},
+                                                         root_dir=root_dir):
+        size, mtime, content_hash = hash_dict[name]
+        sentence_list, word_counter, pair_counter = get_file_entry(text_tokens, matcher, exclude_set)
+        with conn:
+            if name in file_dict:
+                remove_file(conn, name)
+                updated += 1
+            else:
+                added += 1
+            add_file(conn, name, changed_path_dict[name], size, mtime, content_hash, sentence_list, word_counter, pair_counter)
+    return added, updated, len(removed_list)
+
+def load_text_pairs(conn):
+    """
+    Get the filtered text pairs of the index, in the order the files were added
+    """
+    return [[name, sentence] for name, sentence in conn.execute(
+        'SELECT s.name, s.sentence FROM sentences s JOIN files f ON s.name = f.name ORDER BY f.rowid, s.seq')]
+
+def load_word_counts(conn):
+    """
+    Get the word counts of each file which has filtered sentences, in the order the files were added
+    """
+    file_tokens_dict = {name: Counter() for name, in conn.execute(
+        'SELECT name FROM files WHERE name IN (SELECT name FROM sentences) ORDER BY rowid')}
+    for name, word, count in conn.execute('SELECT name, word, count FROM word_counts'):
+        file_tokens_dict[name][word] = count
+    return file_tokens_dict
+
+def load_word_stats(conn):
+    """
+    Get the number of files and the total occurrence of each word
+    """
+    return {word: (file_count, occurrence) for word, file_count, occurrence
+            in conn.execute('SELECT word, file_count, occurrence FROM word_stats')}
+
+def load_pair_counts(conn):
+    """
+    Get the occurrences of each adjacent word pair in each file
+    """
+    pair_counts = dict()
+    for name, word_1, word_2, count in conn.execute('SELECT name, word_1, word_2, count FROM pair_counts'):
+        pair_counts.setdefault((word_1, word_2), dict())[name] = count
+    return pair_counts
+
+def export_index(conn, filter_path, out_path, analysis_path, min_corr_rate, output_format=None, analyse_options=None, count_dict=None):
+    """
+    Write the filtered text, the word counts and the pair analysis from the index, analysed by the options if given
+    Return the paths of the word counts and the pair analysis
+    """
+    file_utils.write_output_filter(load_text_pairs(conn), filter_path)
+
+    result_df = stat_utils.merge_dataframes(load_word_counts(conn))
+    pdf_file_list = list(result_df.columns)
+    result_df['syllables'] = lang_utils.count_syllables_batch(result_df.index)
+    word_stats = load_word_stats(conn)
+    result_df['file_count'] = [word_stats[word][0] for word in result_df.index]
+    result_df['occurrence'] = [word_stats[word][1] for word in result_df.index]
+    out_path_list = stat_utils.write_word_counts(result_df, out_path, ['syllables', 'file_count', 'occurrence'], pdf_file_list, output_format)
+
+    paired_df = stat_utils.analyse_pair(result_df, pdf_file_list, min_corr_rate, [], pair_counts=load_pair_counts(conn),
+                                        count_dict=count_dict, **(analyse_options or dict()))
+    analysis_path_list = stat_utils.write_excel_paired_analysis(paired_df, analysis_path, ['word_1', 'word_2', 'correlation', 'file_count', 'occurrence'], pdf_file_list, output_format)
+    return out_path_list, analysis_path_list
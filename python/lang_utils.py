@@ -3,27 +3,93 @@ Language Utilities
 @author     Teki Chan
 @since      30 Jan 2024
 """
-import nltk
-from nltk.corpus import cmudict
-from nltk.tokenize import word_tokenize
+import cache_utils
+import citation_utils
+import file_utils
+import json
+import metric_utils
+import multiprocessing
 import os
+import pdf_utils
 import re
-from pypdf import PdfReader
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from string import printable
 import logging
+import time
+
+# nltk and pypdf are imported on first use, as they are slow to import and some stages do not need them
+
+# Syllable counts of cmudict words, cached on disk per nltk version
+SYLLABLE_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'pdf_extractor', 'cmudict_syllables_{v}.json')
+_syllable_dict = None
+
+# Number of sentences in each chunk of work given to a worker process
+CHUNK_SIZE = 10000
+# State shared with the functions run by parallel_map, set once per worker process
+_worker_state = dict()
+
+# Words with at least two letters, and the characters removed from the words
+LETTERS_RE = re.compile(r'[a-z]{2,}')
+NON_WORD_RE = re.compile(r'\W')
+
+# Increase when the output of get_text_tokens or massage_tokens changes, so cached results are not reused
+MASSAGE_VERSION = 1
+
+# Options of extracting the text of PDF files by default
+DEFAULT_EXTRACT_OPTIONS = {
+    'backend': 'pypdf'
+    , 'first_pages': None
+    , 'skip_references': False
+}
+
+# Successive whitespaces, and the ASCII control characters which are left after replacing them
+# Backslashes are removed too, as they always were by the escaping in the former pattern of printable chars
+WHITESPACE_RE = re.compile(r'\s+')
+CONTROL_CHAR_TABLE = {code: None for code in range(128) if chr(code) not in printable or chr(code) == '\\'}
+
+# Heading of the reference section, after which no citation in the text is expected
+REFERENCES_RE = re.compile(r'^\s*(?:references|bibliography|works cited|literature cited)\s*$', re.IGNORECASE | re.MULTILINE)
+
+def clean_text(text):
+    """
+    Replace successive whitespaces into single, and remove invisible and non-ASCII chars
+    """
+    return WHITESPACE_RE.sub(' ', text).encode('ascii', 'ignore').decode('ascii').translate(CONTROL_CHAR_TABLE)
+
+def iter_text_tokens(page_text_iter, metric_dict=None, skip_references=False):
+    """
+    Yield text tokens, aka sentences, from the text of each page
+    The text ends at the heading of the reference section if skip_references
+    The pages and the time of extracting and tokenizing are added into the file metrics if given
+    """
+    import nltk
+    page_text_iter = iter(page_text_iter)
+    while True:
+        start = time.perf_counter()
+        text = next(page_text_iter, None)
+        if text is None:
+            break
+        references = REFERENCES_RE.search(text) if skip_references else None
+        if references is not None:
+            text = text[:references.start()]
+        new_text = clean_text(text)
+        extracted = time.perf_counter()
+        sentence_list = nltk.sent_tokenize(new_text)
+        if metric_dict is not None:
+            metric_dict['pages'] += 1
+            metric_dict['extract_text_seconds'] += extracted - start
+            metric_dict['sent_tokenize_seconds'] += time.perf_counter() - extracted
+        yield from sentence_list
+        if references is not None:
+            break
 
 def get_text_tokens(pdf_reader):
     """
     Get a list of text tokens, aka sentences, from PDF Reader
     """
-    text_tokens = list()
-    for page in pdf_reader.pages:
-        text = page.extract_text()
-        new_text = re.sub(r'\s+', ' ', text)    # Replace successive whitespaces into single
-        new_text = re.sub("[^{}]+".format(printable), "", new_text) # Remove invisible chars
-        nltk_tokens = nltk.sent_tokenize(new_text)
-        text_tokens.extend(nltk_tokens)
-    return text_tokens
+    return list(iter_text_tokens(page.extract_text() for page in pdf_reader.pages))
 
 def is_balanced(sentence, open_bracket='(', close_bracket=')'):
     """
@@ -31,100 +97,391 @@ def is_balanced(sentence, open_bracket='(', close_bracket=')'):
     """
     return sentence.count(open_bracket) == sentence.count(close_bracket)
 
-def massage_tokens(text_tokens):
+def iter_massage_tokens(text_tokens):
     """
-    Massage given list of text tokens
+    Massage given text tokens as a stream
+    The last sentence is held back until no following token can be merged into it
     """
-    new_text_tokens = list()
-    idx = 0
-    while idx < len(text_tokens):
-        current_text = text_tokens[idx].strip()
+    last_text = None
+    for idx, text in enumerate(text_tokens):
+        current_text = text.strip()
         if not current_text:
             # skip empty line
             pass
         elif idx > 0 and not re.match(r'\w', current_text[0]):
             # merge previous if not starting with word
-            new_text_tokens[-1] = new_text_tokens[-1] + ' ' + current_text
-        elif idx > 0 and not is_balanced(new_text_tokens[-1]) and not is_balanced(current_text):
+            last_text = last_text + ' ' + current_text
+        elif idx > 0 and not is_balanced(last_text) and not is_balanced(current_text):
             # merged previous if brackets not balanced
-            new_text_tokens[-1] = new_text_tokens[-1] + ' ' + current_text
-        elif idx > 0 and re.match(r'^\d+\s*\.$', new_text_tokens[-1]):
+            last_text = last_text + ' ' + current_text
+        elif idx > 0 and re.match(r'^\d+\s*\.$', last_text):
              # previous numbered points
-             new_text_tokens[-1] = new_text_tokens[-1] + ' ' + current_text
+             last_text = last_text + ' ' + current_text
         elif re.search(r':\s*\d+\s*\.', current_text):
             # numbered point before colon
             searched = re.search(r':\s*\d+\s*\.', current_text)
-            new_text_tokens.append(current_text[:searched.start() + 1].strip())
-            new_text_tokens.append(current_text[searched.start() + 1:].strip())
+            if last_text is not None:
+                yield last_text
+            yield current_text[:searched.start() + 1].strip()
+            last_text = current_text[searched.start() + 1:].strip()
         else:
-            new_text_tokens.append(current_text)
-        idx += 1
-    return new_text_tokens
+            if last_text is not None:
+                yield last_text
+            last_text = current_text
+    if last_text is not None:
+        yield last_text
 
-def get_path_tokens(pdf_path_list):
+def massage_tokens(text_tokens):
     """
-    Process each file from the list and save the result in the dict
+    Massage given list of text tokens
+    """
+    return list(iter_massage_tokens(text_tokens))
+
+def get_page_limit(extract_options, page_limit=None):
+    """
+    Get the number of the first pages to extract by the options and the given limit, or None if there is no limit
+    """
+    limit_list = [limit for limit in [extract_options['first_pages'], page_limit] if limit is not None]
+    return min(limit_list) if limit_list else None
+
+def extract_tokens(pdf_doc, extract_options, page_limit=None, metric_dict=None):
+    """
+    Get the massaged text tokens of the PDF file opened by pdf_utils by the options, up to page_limit pages if given
+    The sentences and the timings are added into the file metrics if given
+    """
+    start = time.perf_counter()
+    text_tokens = massage_tokens(iter_text_tokens(pdf_doc.iter_pages(get_page_limit(extract_options, page_limit)),
+                                                  metric_dict, extract_options['skip_references']))
+    if metric_dict is not None:
+        metric_dict['sentences'] = len(text_tokens)
+        # Massaging is streamed with extracting, so it takes the rest of the time
+        metric_dict['massage_seconds'] = time.perf_counter() - start \
+            - metric_dict['extract_text_seconds'] - metric_dict['sent_tokenize_seconds']
+    return text_tokens
+
+def get_pdf_tokens(pdf_path, metric_dict=None, extract_options=DEFAULT_EXTRACT_OPTIONS):
     """
-    path_tokens_dict = dict()
-    for pdf_path in pdf_path_list:
+    Get the massaged text tokens of a single PDF file, or None if it cannot be read
+    """
+    try:
+        pdf_doc = pdf_utils.open_pdf(pdf_path, extract_options['backend'])
         try:
-            reader = PdfReader(pdf_path)
-            text_tokens = get_text_tokens(reader)
-            new_text_tokens = massage_tokens(text_tokens)
-            file_name = os.path.basename(pdf_path)
-            path_tokens_dict[file_name] = new_text_tokens
-        except:
-            logging.exception('Failed to read PDF {pp}'.format(pp=pdf_path))
-    return path_tokens_dict
-
-def is_citation(text_line, regex_ptns=[]):
-    """
-    Whether the given sentence is citation
-    """
-    for regex_ptn in regex_ptns:
-        if re.search(regex_ptn, text_line.lower()):
-            return True
-
-    return False
-
-def is_citation_named(text_line, unamed_ptn_list, ptn_list):
-    for unamed_ptn in unamed_ptn_list:
-        matched = re.search(unamed_ptn, text_line)
-        if matched:
-            is_matched = is_citation(matched.group(), ptn_list)
-            if is_matched:
-                return True
-    return False       
-
-def is_named_citation(text_line, author_list, unamed_ptn_list, named_ptn_list, named_year_ptn_list, operator='or'):
-    """
-    Whether the given sentence is citation with given names
-    """    
-    for author in author_list:
-        if '-' in author:
-            [author_name, year] = author.split('-', 1)
-            ptn_list = [ named_year_ptn.replace('$name', author_name).replace('$year', year) for named_year_ptn in named_year_ptn_list ]
+            return extract_tokens(pdf_doc, extract_options, metric_dict=metric_dict)
+        finally:
+            pdf_doc.close()
+    except:
+        logging.exception('Failed to read PDF {pp}'.format(pp=pdf_path))
+        return None
+
+# Reason of skipping a PDF file which cannot be read at all
+READ_FAILURE = 'failed to read'
+
+def _guarded_worker(pdf_path, max_pages, max_memory_mb, page_limit, conn, with_metrics=False,
+                    extract_options=DEFAULT_EXTRACT_OPTIONS):
+    """
+    Extract the PDF file in the isolated process, and send back the text tokens with the reason of failure
+    and the file metrics if with_metrics
+    """
+    metric_dict = metric_utils.new_file_metrics(pdf_path) if with_metrics else None
+    if max_memory_mb is not None:
+        import resource
+        max_memory = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+    try:
+        pdf_doc = pdf_utils.open_pdf(pdf_path, extract_options['backend'])
+        page_count = pdf_doc.get_page_count()
+        if max_pages is not None and page_count > max_pages:
+            conn.send((None, '{n} pages over limit of {m}'.format(n=page_count, m=max_pages), metric_dict))
         else:
-            ptn_list = [ named_ptn.replace('$name', author) for named_ptn in named_ptn_list ]
-        is_matched = is_citation_named(text_line, unamed_ptn_list, ptn_list)              
-        if operator == 'or' and is_matched:
-            return True
-        elif operator == 'and' and not is_matched:
-            return False        
-    return False if operator == 'or' else True
+            conn.send((extract_tokens(pdf_doc, extract_options, page_limit, metric_dict), None, metric_dict))
+    except MemoryError:
+        conn.send((None, 'memory over limit of {m} MB'.format(m=max_memory_mb), metric_dict))
+    except:
+        logging.exception('Failed to read PDF {pp}'.format(pp=pdf_path))
+        conn.send((None, READ_FAILURE, metric_dict))
+    finally:
+        conn.close()
+
+def _run_guarded(pdf_path, timeout=None, max_pages=None, max_memory_mb=None, page_limit=None, metric_dict=None,
+                 extract_options=DEFAULT_EXTRACT_OPTIONS):
+    """
+    Run the extraction of the PDF file in an isolated process, which is killed if over the wall-clock timeout
+    The file metrics of the process are added into the given metrics
+    """
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_guarded_worker,
+                                      args=(pdf_path, max_pages, max_memory_mb, page_limit, child_conn,
+                                            metric_dict is not None, extract_options),
+                                      daemon=True)
+    process.start()
+    child_conn.close()
+    try:
+        if parent_conn.poll(timeout):
+            result = parent_conn.recv()
+        else:
+            result = (None, 'timeout over {t} seconds'.format(t=timeout), None)
+            process.kill()
+    except EOFError:
+        # The process died without any result, e.g. killed by the system for memory
+        result = None
+    finally:
+        parent_conn.close()
+    process.join()
+    if result is None:
+        result = (None, 'crashed with exit code {c}'.format(c=process.exitcode), None)
+    text_tokens, skip_reason, child_metric_dict = result
+    if metric_dict is not None and child_metric_dict is not None:
+        metric_dict.update(child_metric_dict)
+    return text_tokens, skip_reason
+
+def get_guarded_pdf_tokens(pdf_path, timeout=None, max_pages=None, max_memory_mb=None, retry_pages=None, metric_dict=None,
+                           extract_options=DEFAULT_EXTRACT_OPTIONS):
+    """
+    Get the massaged text tokens of a single PDF file extracted in an isolated process under the limits
+    If it is over the limits, it is retried for the first retry_pages pages only if given
+    Return the text tokens, or None if skipped, and the reason if it is skipped or partial
+    """
+    text_tokens, skip_reason = _run_guarded(pdf_path, timeout, max_pages, max_memory_mb, None, metric_dict, extract_options)
+    # Unreadable files are not retried, as they are not over any limit
+    if skip_reason not in [None, READ_FAILURE] and retry_pages is not None:
+        retry_tokens, retry_reason = _run_guarded(pdf_path, timeout, None, max_memory_mb, retry_pages, metric_dict, extract_options)
+        if retry_reason is None:
+            return retry_tokens, '{r}, extracted first {n} pages only'.format(r=skip_reason, n=retry_pages)
+        skip_reason = '{r}, retry failed by {rr}'.format(r=skip_reason, rr=retry_reason)
+    if skip_reason is not None:
+        logging.warning('Skipped PDF {pp} by {r}'.format(pp=pdf_path, r=skip_reason))
+    return text_tokens, skip_reason
+
+def get_limits(timeout=None, max_pages=None, max_memory_mb=None, retry_pages=None):
+    """
+    Get the limits of extracting a single PDF file, or None if there is no limit
+    """
+    if timeout is None and max_pages is None and max_memory_mb is None:
+        return None
+    return {
+        'timeout': timeout
+        , 'max_pages': max_pages
+        , 'max_memory_mb': max_memory_mb
+        , 'retry_pages': retry_pages
+    }
+
+def get_cached_pdf_tokens(pdf_path, cache_dir=None, rebuild_cache=False, settings=None, limits=None, with_metrics=False,
+                          extract_options=DEFAULT_EXTRACT_OPTIONS, content_hash=None):
+    """
+    Get the massaged text tokens of a single PDF file through the cache, under the limits if given
+    The file is not hashed again for the cache if its hash is given
+    Return the text tokens, or None if it cannot be read, the reason if it is skipped or partial by the limits,
+    and the file metrics if with_metrics
+    """
+    start = time.perf_counter()
+    metric_dict = metric_utils.new_file_metrics(pdf_path) if with_metrics else None
+    cache_key = None
+    if cache_dir is not None:
+        try:
+            cache_key = cache_utils.get_cache_key(content_hash or cache_utils.get_file_hash(pdf_path), settings)
+        except OSError:
+            # Leave it to the extraction to report the unreadable file
+            pass
+    if cache_key is not None and not rebuild_cache:
+        text_tokens = cache_utils.read_cache(cache_dir, cache_key)
+        if text_tokens is not None:
+            if metric_dict is not None:
+                metric_dict.update({'cached': True, 'sentences': len(text_tokens), 'total_seconds': time.perf_counter() - start})
+            return text_tokens, None, metric_dict
+
+    if limits is None:
+        text_tokens, skip_reason = get_pdf_tokens(pdf_path, metric_dict, extract_options), None
+    else:
+        text_tokens, skip_reason = get_guarded_pdf_tokens(pdf_path, metric_dict=metric_dict, extract_options=extract_options, **limits)
+    # Partial text is not cached
+    if text_tokens is not None and skip_reason is None and cache_key is not None:
+        cache_utils.write_cache(cache_dir, cache_key, text_tokens)
+    if metric_dict is not None:
+        metric_dict['skipped'] = skip_reason if skip_reason is not None or text_tokens is not None else READ_FAILURE
+        metric_dict['total_seconds'] = time.perf_counter() - start
+    return text_tokens, skip_reason, metric_dict
+
+def _get_path_hash_tokens(path_hash, **kwargs):
+    pdf_path, content_hash = path_hash
+    return get_cached_pdf_tokens(pdf_path, content_hash=content_hash, **kwargs)
+
+def set_worker_state(state_dict):
+    """
+    Share the given state with the functions run by parallel_map, once per worker process
+    """
+    _worker_state.update(state_dict)
+
+def parallel_map(func, item_list, workers=1, state_dict=None, use_threads=False):
+    """
+    Map the function over the list in order, using a pool of worker processes, or threads if use_threads,
+    if workers is not 1, where 0 means one worker per CPU core
+    """
+    if workers == 1 or len(item_list) <= 1:
+        if state_dict is not None:
+            set_worker_state(state_dict)
+        yield from map(func, item_list)
+        return
+    workers = workers or os.cpu_count()
+    initargs = () if state_dict is None else (state_dict, )
+    initializer = None if state_dict is None else set_worker_state
+    executor_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    with executor_class(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        # Keep a bounded window of pending items, so finished results do not pile up in memory
+        # Results are yielded in the order of the given list, so the output stays deterministic
+        future_queue = deque()
+        for item in item_list:
+            if len(future_queue) >= workers * 2:
+                yield future_queue.popleft().result()
+            future_queue.append(executor.submit(func, item))
+        while future_queue:
+            yield future_queue.popleft().result()
+
+def get_chunks(item_iter, chunk_size=CHUNK_SIZE):
+    """
+    Split the items into a list of chunks of the given size
+    """
+    chunk_list = list()
+    chunk = list()
+    for item in item_iter:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            chunk_list.append(chunk)
+            chunk = list()
+    if chunk:
+        chunk_list.append(chunk)
+    return chunk_list
+
+def get_extract_options(backend='pypdf', first_pages=None, skip_references=False):
+    """
+    Get the options of extracting the text of PDF files
+    """
+    return {
+        'backend': backend
+        , 'first_pages': first_pages
+        , 'skip_references': skip_references
+    }
+
+def get_extract_settings(extract_options=DEFAULT_EXTRACT_OPTIONS):
+    """
+    Get the settings which affect the extracted text tokens of a PDF file
+    """
+    import nltk
+    settings = {
+        extract_options['backend']: pdf_utils.BACKEND_DICT[extract_options['backend']].get_version()
+        , 'nltk': nltk.__version__
+        , 'massage': MASSAGE_VERSION
+    }
+    # Settings by default are kept the same as those before the options, so that cached results are reused
+    if extract_options != DEFAULT_EXTRACT_OPTIONS:
+        settings['options'] = extract_options
+    return settings
+
+def iter_path_tokens(pdf_path_list, workers=1, cache_dir=None, rebuild_cache=False, limits=None, skip_report=None,
+                     file_metrics=None, extract_options=DEFAULT_EXTRACT_OPTIONS, hash_dict=None, root_dir=None):
+    """
+    Process each file from the list and yield the file name with its text tokens
+    as soon as the file is finished
+    Files whose content was extracted before are read from the cache if cache_dir is given
+    Files are extracted in isolated processes under the limits if given, and the skipped files
+    are written to the skip report if given
+    The metrics of each file are appended to file_metrics if it is a list
+    Files are not hashed again for the cache if their hashes are given in hash_dict, such as those of the manifest
+    Files are named by their paths relative to root_dir if given, or by their base names
+    """
+    get_tokens = partial(_get_path_hash_tokens, cache_dir=cache_dir, rebuild_cache=rebuild_cache,
+                         settings=get_extract_settings(extract_options), limits=limits, with_metrics=file_metrics is not None,
+                         extract_options=extract_options)
+    # Each file under the limits has its own process, so the pool only has to wait for them
+    hash_dict = dict() if hash_dict is None else hash_dict
+    path_hash_list = [(pdf_path, hash_dict.get(pdf_path)) for pdf_path in pdf_path_list]
+    tokens_list = parallel_map(get_tokens, path_hash_list, workers, use_threads=limits is not None)
+    skip_list = list()
+    for pdf_path, (text_tokens, skip_reason, metric_dict) in zip(pdf_path_list, tokens_list):
+        if metric_dict is not None:
+            file_metrics.append(metric_dict)
+        if skip_reason is not None:
+            skip_list.append([pdf_path, skip_reason])
+        if text_tokens is not None:
+            yield file_utils.get_file_name(pdf_path, root_dir), text_tokens
+    if skip_report is not None:
+        file_utils.write_skip_report(skip_list, skip_report)
+
+def get_path_tokens(pdf_path_list, workers=1, cache_dir=None, rebuild_cache=False, limits=None, skip_report=None,
+                    extract_options=DEFAULT_EXTRACT_OPTIONS):
+    """
+    Process each file from the list and save the result in the dict
+    """
+    return dict(iter_path_tokens(pdf_path_list, workers, cache_dir, rebuild_cache, limits, skip_report,
+                                 extract_options=extract_options))
+
+def _scan_chunk(text_pair_list):
+    matcher = _worker_state['matcher']
+    citation_list = list()
+    for text_pair in text_pair_list:
+        match_list = matcher.scan(text_pair[1])
+        if match_list is not None:
+            citation_list.append((text_pair, match_list))
+    return citation_list, matcher.pop_timing()
+
+def get_citation_matcher(authors=None, operator="or",
+                         unamed_ptn_list=[], named_ptn_list=[], named_year_ptn_list=[]):
+    """
+    Get the matcher of citation with the given comma separated authors
+    """
+    author_list = None if authors is None else [author for author in authors.lower().split(',')]
+    return citation_utils.CitationMatcher(unamed_ptn_list, named_ptn_list, named_year_ptn_list,
+                                          author_list, operator)
+
+def scan_citation(text_pair_list, authors=None, operator="or",
+                  unamed_ptn_list=[], named_ptn_list=[], named_year_ptn_list=[], workers=1, timing_dict=None):
+    """
+    Scan citation, returning each filtered text pair with its list of CitationMatch
+    The time and the evaluations of each pattern are added into timing_dict if given
+    """
+    matcher = get_citation_matcher(authors, operator, unamed_ptn_list, named_ptn_list, named_year_ptn_list)
+    if timing_dict is not None:
+        matcher.enable_timing()
+    state_dict = {'matcher': matcher}
+    if workers == 1:
+        set_worker_state(state_dict)
+        chunk_result_list = [_scan_chunk(text_pair_list)]
+    else:
+        chunk_result_list = parallel_map(_scan_chunk, get_chunks(text_pair_list), workers, state_dict)
+    citation_list = list()
+    for chunk_citation_list, chunk_timing_dict in chunk_result_list:
+        citation_list.extend(chunk_citation_list)
+        if timing_dict is not None:
+            metric_utils.merge_timing(timing_dict, chunk_timing_dict)
+    return citation_list
 
 def filter_citation(text_pair_list, authors=None, operator="or",
-                    unamed_ptn_list=[], named_ptn_list=[], named_year_ptn_list=[]):
+                    unamed_ptn_list=[], named_ptn_list=[], named_year_ptn_list=[], workers=1):
     """
     Filter citation
     """
-    # Unamed Pattern
-    filtered_pair = filter(lambda text_pair: is_citation(text_pair[1], unamed_ptn_list), text_pair_list)
-    if authors is not None:
-        author_list = [author for author in authors.lower().split(',')]
-        filtered_pair_list = list(filtered_pair)
-        filtered_pair = filter(lambda text_pair: is_named_citation(text_pair[1], author_list, unamed_ptn_list, named_ptn_list, named_year_ptn_list, operator), filtered_pair_list)
-    return list(filtered_pair)
+    citation_list = scan_citation(text_pair_list, authors, operator,
+                                  unamed_ptn_list, named_ptn_list, named_year_ptn_list, workers)
+    return [text_pair for text_pair, match_list in citation_list]
+
+def _match_chunk(text_pair_list):
+    matcher = _worker_state['query_matcher']
+    return [(text_pair, matcher.match(text_pair[1])) for text_pair in text_pair_list]
+
+def filter_queries(text_pair_list, query_list,
+                   unamed_ptn_list=[], named_ptn_list=[], named_year_ptn_list=[], workers=1):
+    """
+    Filter citation for many queries in one pass over the text
+    Return the list of filtered text pairs of each query
+    """
+    matcher = citation_utils.QueryMatcher(query_list, unamed_ptn_list, named_ptn_list, named_year_ptn_list)
+    state_dict = {'query_matcher': matcher}
+    filtered_pair_lists = [list() for query in query_list]
+    chunk_list = get_chunks(text_pair_list)
+    for chunk_match_list in parallel_map(_match_chunk, chunk_list, workers, state_dict):
+        for text_pair, query_idx_list in chunk_match_list:
+            for query_idx in query_idx_list:
+                filtered_pair_lists[query_idx].append(text_pair)
+    return filtered_pair_lists
 
 def split_digits(word_tokens):
     new_word_list = list()
@@ -148,16 +505,42 @@ def merge_hyphen_words(word_tokens):
 def cleanse_words(word_list):
     return [ re.sub(r'[^-\w]+', '', word) for word in word_list ]
 
-def get_file_tokens(text_pair_list, exclude_list):
+def get_word_tokens(sentence, exclude_set):
+    """
+    Get the cleansed lowercase words of the sentence which are not excluded
+    """
+    from nltk.tokenize import word_tokenize
+    word_list = split_digits(word_tokenize(sentence))
+    word_list = merge_hyphen_words(word_list)
+    word_tokens = list()
+    for word in word_list:
+        lower_word = word.lower()
+        if lower_word not in exclude_set and LETTERS_RE.search(lower_word):
+            word_tokens.append(NON_WORD_RE.sub('', lower_word))
+    return word_tokens
+
+def _count_chunk(text_pair_list):
+    exclude_set = _worker_state['exclude_set']
     file_tokens_dict = dict()
     for text_pair in text_pair_list:
         filename = text_pair[0]
         sentence = text_pair[1]
-        all_word_tokens = file_tokens_dict.get(filename, list())
-        word_list = split_digits(word_tokenize(sentence))
-        word_list = merge_hyphen_words(word_list)
-        all_word_tokens.extend([re.sub(r'\W', '', word.lower()) for word in word_list if re.search(r'[a-z]{2,}', word.lower()) and word.lower() not in exclude_list ])
-        file_tokens_dict[filename] = all_word_tokens
+        word_counter = file_tokens_dict.setdefault(filename, Counter())
+        word_counter.update(get_word_tokens(sentence, exclude_set))
+    return file_tokens_dict
+
+def get_file_tokens(text_pair_list, exclude_list, workers=1):
+    """
+    Count the word tokens of each file, in chunks of sentences run by a pool of worker processes
+    if workers is not 1
+    """
+    file_tokens_dict = dict()
+    chunk_list = get_chunks(text_pair_list)
+    state_dict = {'exclude_set': frozenset(exclude_list)}
+    for chunk_tokens_dict in parallel_map(_count_chunk, chunk_list, workers, state_dict):
+        # Merge the counts of the chunks in order, so files stay in the order of the text
+        for filename, word_counter in chunk_tokens_dict.items():
+            file_tokens_dict.setdefault(filename, Counter()).update(word_counter)
     return file_tokens_dict
 
 def _syllables(word):
@@ -181,12 +564,72 @@ def _syllables(word):
         count += 1
     return count 
 
-def count_syllables(word, dict_dict=cmudict.dict(), option=0):
+def get_syllable_counts(pronunciations):
+    """
+    Get the syllable count of each pronunciation of a word in cmudict, by its phonemes with a stress digit
+    """
+    return [len([y for y in x if y[-1].isdigit()]) for x in pronunciations]
+
+def get_syllable_dict():
+    """
+    Get the mapping of each word to the syllable counts of its pronunciations in cmudict
+    The mapping is built once and cached on disk, so that cmudict is not parsed again
+    """
+    global _syllable_dict
+    if _syllable_dict is None:
+        import nltk
+        cache_path = SYLLABLE_CACHE_PATH.format(v=nltk.__version__)
+        try:
+            with open(cache_path, 'r') as fr:
+                _syllable_dict = json.load(fr)
+        except (OSError, ValueError):
+            from nltk.corpus import cmudict
+            _syllable_dict = {word: get_syllable_counts(pronunciations) for word, pronunciations in cmudict.dict().items()}
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                with open(cache_path, 'w') as fw:
+                    json.dump(_syllable_dict, fw, separators=(',', ':'))
+            except OSError:
+                logging.exception('Failed to save syllable dictionary {cp}'.format(cp=cache_path))
+    return _syllable_dict
+
+def _count_syllables(word, option=0, dict_dict=None):
+    """
+    Count syllables of a word by its pronunciations in the given cmudict dictionary, or in the syllable dictionary
+    if not given, and estimate them if the word is not in the dictionary
+    """
     try:
-        syllable_counts = [len(list(y for y in x if y[-1].isdigit())) for x in dict_dict[word.lower()]]
-        if len(syllable_counts) > 0:
-            return syllable_counts[option]
+        if dict_dict is None:
+            syllable_counts = get_syllable_dict()[word.lower()]
         else:
-            return 0
+            syllable_counts = get_syllable_counts(dict_dict[word.lower()])
     except KeyError:
         return _syllables(word)
+    if len(syllable_counts) > 0:
+        return syllable_counts[option]
+    else:
+        return 0
+
+def count_syllables(word, dict_dict=None, option=0):
+    return _count_syllables(word, option, dict_dict)
+
+def count_syllables_batch(word_list, option=0):
+    """
+    Count syllables of a list of words, looking up each distinct word once
+    """
+    count_dict = {word: _count_syllables(str(word), option) for word in set(word_list)}
+    return [count_dict[word] for word in word_list]
+
+def warm_up():
+    """
+    Import nltk and pypdf, and load the sentence tokenizer, the word tokenizer and the syllable dictionary
+    into memory, so that later calls in this process do not pay for loading them
+    """
+    import nltk
+    import pypdf
+    from nltk.tokenize import word_tokenize
+    for load_func in [lambda: nltk.sent_tokenize('Warm up.'), lambda: word_tokenize('Warm up.'), get_syllable_dict]:
+        try:
+            load_func()
+        except LookupError:
+            logging.exception('Failed to load nltk data')
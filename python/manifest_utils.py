@@ -0,0 +1,125 @@
+"""
+Manifest Utilities
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import cache_utils
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import json
+import logging
+import os
+
+# Increase when the format of the manifest changes, so older manifests are scanned again
+MANIFEST_VERSION = 1
+
+def is_pdf_file(entry):
+    return entry.name.lower().endswith('.pdf') and entry.is_file()
+
+def get_file_entry(file_path, stat, old_file=None, with_hash=True):
+    """
+    Get the size, the modified time and the hash of a file, where the hash is reused if its size and modified time
+    did not change
+    """
+    if old_file is not None and old_file[:2] == [stat.st_size, stat.st_mtime] and old_file[2] is not None:
+        content_hash = old_file[2]
+    else:
+        content_hash = cache_utils.get_file_hash(file_path) if with_hash else None
+    return [stat.st_size, stat.st_mtime, content_hash]
+
+def scan_dir(dir_path, old_dir_entry=None, with_hash=True, rescan=False):
+    """
+    Scan a directory for PDF files and subdirectories, where the directory is not listed again if it did not change
+    Every known file is checked by its size and modified time, so that a file rewritten in place is hashed again
+    Return the entry of the directory
+    """
+    # The modified time is read before the scan, so a change during the scan is found by the next scan
+    dir_mtime = os.stat(dir_path).st_mtime
+    old_file_dict = dict() if old_dir_entry is None else old_dir_entry['files']
+    file_dict = dict()
+    if old_dir_entry is not None and not rescan and old_dir_entry['mtime'] == dir_mtime:
+        # No entry was added or removed, but the known files may be rewritten in place
+        for name, old_file in old_file_dict.items():
+            file_path = os.path.join(dir_path, name)
+            try:
+                file_dict[name] = get_file_entry(file_path, os.stat(file_path), old_file, with_hash)
+            except OSError:
+                logging.exception('Failed to scan {p}'.format(p=file_path))
+        return {'mtime': dir_mtime, 'files': file_dict, 'subdirs': old_dir_entry['subdirs']}
+    subdir_list = list()
+    with os.scandir(dir_path) as entry_iter:
+        for entry in entry_iter:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdir_list.append(entry.name)
+                elif is_pdf_file(entry):
+                    file_dict[entry.name] = get_file_entry(entry.path, entry.stat(), old_file_dict.get(entry.name), with_hash)
+            except OSError:
+                logging.exception('Failed to scan {p}'.format(p=entry.path))
+    return {'mtime': dir_mtime, 'files': file_dict, 'subdirs': sorted(subdir_list)}
+
+def scan_tree(root_dir, old_dir_dict=None, threads=8, with_hash=True, rescan=False):
+    """
+    Scan the directory tree concurrently, a directory per task
+    Return the entry of each directory keyed by its path relative to the root, where the root is ''
+    """
+    old_dir_dict = dict() if old_dir_dict is None else old_dir_dict
+    dir_dict = dict()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        def submit(rel_path):
+            return executor.submit(scan_dir, os.path.join(root_dir, rel_path), old_dir_dict.get(rel_path), with_hash, rescan)
+        future_dict = {submit(''): ''}
+        while future_dict:
+            done_set, pending_set = wait(future_dict, return_when=FIRST_COMPLETED)
+            for future in done_set:
+                rel_path = future_dict.pop(future)
+                try:
+                    dir_entry = future.result()
+                except OSError:
+                    logging.exception('Failed to scan directory {d}'.format(d=os.path.join(root_dir, rel_path)))
+                    continue
+                dir_dict[rel_path] = dir_entry
+                for subdir in dir_entry['subdirs']:
+                    sub_path = os.path.join(rel_path, subdir)
+                    future_dict[submit(sub_path)] = sub_path
+    return dir_dict
+
+def get_file_dict(dir_dict, root_dir):
+    """
+    Get the size, the modified time and the hash of each PDF file of the scanned directories, sorted by path
+    """
+    file_list = [(os.path.join(root_dir, rel_path, name), tuple(file_entry))
+                 for rel_path, dir_entry in dir_dict.items()
+                 for name, file_entry in dir_entry['files'].items()]
+    return dict(sorted(file_list))
+
+def read_manifest(manifest_path, root_dir):
+    """
+    Read the scanned directories of the manifest, or an empty dict if it does not exist or is of another root
+    """
+    try:
+        with open(manifest_path, 'r') as fr:
+            manifest = json.load(fr)
+    except (OSError, ValueError):
+        return dict()
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('root') != os.path.abspath(root_dir):
+        return dict()
+    return manifest['dirs']
+
+def write_manifest(manifest_path, root_dir, dir_dict):
+    """
+    Write the scanned directories into the manifest atomically
+    """
+    temp_path = '{p}.{pid}.tmp'.format(p=manifest_path, pid=os.getpid())
+    with open(temp_path, 'w') as fw:
+        json.dump({'version': MANIFEST_VERSION, 'root': os.path.abspath(root_dir), 'dirs': dir_dict}, fw)
+    os.replace(temp_path, manifest_path)
+
+def update_manifest(root_dir, manifest_path, threads=8, rescan=False):
+    """
+    Bring the manifest of the directory tree up to date, where only the changed directories are listed again
+    unless rescan, and the hashes of unchanged files are reused
+    Return the size, the modified time and the hash of each PDF file, sorted by path
+    """
+    dir_dict = scan_tree(root_dir, read_manifest(manifest_path, root_dir), threads, True, rescan)
+    write_manifest(manifest_path, root_dir, dir_dict)
+    return get_file_dict(dir_dict, root_dir)
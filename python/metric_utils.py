@@ -0,0 +1,171 @@
+"""
+Metric Utilities
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import json
+import os
+import sys
+import time
+
+def new_file_metrics(pdf_path):
+    """
+    Get the empty metrics of extracting a single PDF file
+    """
+    try:
+        file_size = os.path.getsize(pdf_path)
+    except OSError:
+        file_size = 0
+    return {
+        'file': os.path.basename(pdf_path)
+        , 'bytes': file_size
+        , 'pages': 0
+        , 'sentences': 0
+        , 'cached': False
+        , 'skipped': None
+        , 'extract_text_seconds': 0.0
+        , 'sent_tokenize_seconds': 0.0
+        , 'massage_seconds': 0.0
+        , 'total_seconds': 0.0
+    }
+
+def add_timing(timing_dict, label, seconds):
+    """
+    Add the seconds of an evaluation to the [seconds, evaluations] of the label
+    """
+    timing = timing_dict.setdefault(label, [0.0, 0])
+    timing[0] += seconds
+    timing[1] += 1
+
+def merge_timing(timing_dict, other_timing_dict):
+    for label, (seconds, evaluations) in other_timing_dict.items():
+        timing = timing_dict.setdefault(label, [0.0, 0])
+        timing[0] += seconds
+        timing[1] += evaluations
+
+class TimedPattern:
+    """
+    Compiled regular expression which adds the time of each search into the timing of its label
+    """
+    def __init__(self, pattern, label, timing_dict):
+        self.pattern = pattern
+        self.label = label
+        self.timing_dict = timing_dict
+
+    def search(self, text):
+        start = time.perf_counter()
+        matched = self.pattern.search(text)
+        add_timing(self.timing_dict, self.label, time.perf_counter() - start)
+        return matched
+
+    def finditer(self, text):
+        start = time.perf_counter()
+        matched_list = list(self.pattern.finditer(text))
+        add_timing(self.timing_dict, self.label, time.perf_counter() - start)
+        return iter(matched_list)
+
+def get_peak_rss():
+    """
+    Get the peak resident set size in bytes of this process and of its finished child processes
+    """
+    import resource
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+        , 'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    }
+
+class Metrics:
+    """
+    Timings and counts of the stages, the files and the patterns of a run
+    """
+    def __init__(self, profile_path=None):
+        self.profile_path = profile_path
+        self.stage_dict = dict()
+        self.file_list = list()
+        self.pattern_dict = dict()
+        self.count_dict = dict()
+        self.current_stage = None
+        self.profiler = None
+
+    def start_stage(self, stage_name):
+        """
+        Stop the current stage if any, and start timing the given stage, profiling it if the profile path is given
+        """
+        self.end_stage()
+        self.current_stage = (stage_name, time.perf_counter())
+        if self.profile_path is not None:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def end_stage(self):
+        """
+        Stop the current stage if any, and write its profile into a file per stage
+        """
+        if self.current_stage is None:
+            return
+        stage_name, start = self.current_stage
+        self.stage_dict[stage_name] = self.stage_dict.get(stage_name, 0.0) + time.perf_counter() - start
+        self.current_stage = None
+        if self.profiler is not None:
+            self.profiler.disable()
+            stem, extension = os.path.splitext(self.profile_path)
+            self.profiler.dump_stats('{s}_{n}{e}'.format(s=stem, n=stage_name, e=extension))
+            self.profiler = None
+
+    def get_dict(self):
+        return {
+            'stages': self.stage_dict
+            , 'files': self.file_list
+            , 'patterns': {label: {'seconds': seconds, 'evaluations': evaluations}
+                           for label, (seconds, evaluations) in self.pattern_dict.items()}
+            , 'counts': self.count_dict
+            , 'peak_rss_bytes': get_peak_rss()
+        }
+
+    def get_prometheus_text(self):
+        """
+        Get the metrics in the Prometheus text format
+        """
+        metric_dict = self.get_dict()
+        line_list = list()
+        def add_metric(name, sample_list, help_text):
+            if len(sample_list) == 0:
+                return
+            line_list.append('# HELP pdf_extractor_{n} {h}'.format(n=name, h=help_text))
+            line_list.append('# TYPE pdf_extractor_{n} gauge'.format(n=name))
+            for label_dict, value in sample_list:
+                labels = ','.join('{k}="{v}"'.format(k=key, v=str(label).replace('\\', '\\\\').replace('"', '\\"'))
+                                  for key, label in label_dict.items())
+                line_list.append('pdf_extractor_{n}{{{l}}} {v}'.format(n=name, l=labels, v=float(value)))
+
+        add_metric('stage_seconds', [({'stage': stage}, seconds) for stage, seconds in self.stage_dict.items()],
+                   'Seconds spent in each stage')
+        for key in ['bytes', 'pages', 'sentences']:
+            add_metric('file_{k}'.format(k=key), [({'file': file_dict['file']}, file_dict[key]) for file_dict in self.file_list],
+                       'Number of {k} of each file'.format(k=key))
+        add_metric('file_seconds', [({'file': file_dict['file'], 'step': step}, file_dict['{s}_seconds'.format(s=step)])
+                                    for file_dict in self.file_list
+                                    for step in ['extract_text', 'sent_tokenize', 'massage', 'total']],
+                   'Seconds spent in each step of extracting each file')
+        add_metric('pattern_seconds', [({'pattern': label}, pattern['seconds']) for label, pattern in metric_dict['patterns'].items()],
+                   'Seconds spent in each pattern')
+        add_metric('pattern_evaluations', [({'pattern': label}, pattern['evaluations']) for label, pattern in metric_dict['patterns'].items()],
+                   'Number of evaluations of each pattern')
+        add_metric('count', [({'name': name}, count) for name, count in self.count_dict.items()],
+                   'Counts of the stages')
+        add_metric('peak_rss_bytes', [({'process': process}, rss) for process, rss in metric_dict['peak_rss_bytes'].items()],
+                   'Peak resident set size')
+        return '\n'.join(line_list) + '\n'
+
+    def write(self, output_path):
+        """
+        Write the metrics in the Prometheus text format if the file extension is prom, or in JSON
+        """
+        with open(output_path, 'w') as fw:
+            if os.path.splitext(output_path)[1].lower() == '.prom':
+                fw.write(self.get_prometheus_text())
+            else:
+                json.dump(self.get_dict(), fw, indent=4)
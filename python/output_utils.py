@@ -0,0 +1,173 @@
+"""
+Output Utilities
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import os
+import pandas as pd
+
+# Number of rows converted and written at a time
+CHUNK_SIZE = 10000
+
+def to_dense(df):
+    """
+    Convert sparse columns of the dataframe into dense ones
+    """
+    sparse_dtype_dict = {column: dtype.subtype for column, dtype in df.dtypes.items()
+                         if isinstance(dtype, pd.SparseDtype)}
+    return df.astype(sparse_dtype_dict) if sparse_dtype_dict else df
+
+def iter_chunks(df, columns, chunk_size=CHUNK_SIZE):
+    """
+    Yield dense chunks of rows of the given columns
+    """
+    for start in range(0, len(df), chunk_size):
+        yield to_dense(df.iloc[start:start + chunk_size][columns])
+
+def get_format(output_path, output_format=None):
+    """
+    Get the output format, given or by the file extension, which is xlsx by default
+    """
+    if output_format is not None:
+        return output_format
+    extension = os.path.splitext(output_path)[1].lstrip('.').lower()
+    return extension if extension in WRITER_DICT else 'xlsx'
+
+def get_output_path(output_path, output_format=None, sheet_name=None):
+    """
+    Get the path of the output in the given format, with the sheet name if it is in a separate file
+    """
+    if output_format is None and sheet_name is None:
+        return output_path
+    output_format = get_format(output_path, output_format)
+    stem = os.path.splitext(output_path)[0]
+    if sheet_name is not None:
+        stem = '{s}_{n}'.format(s=stem, n=sheet_name)
+    return '{s}.{f}'.format(s=stem, f=output_format)
+
+def write_xlsx(output_path, sheet_name, df, columns, index, writer=None):
+    """
+    Write the rows into a sheet of a write-only workbook, which streams rows with constant memory
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    sheet = writer.create_sheet(sheet_name)
+    header = ([df.index.name] if index else []) + list(columns)
+    header_cell_list = list()
+    for column in header:
+        cell = WriteOnlyCell(sheet, value=None if column is None else str(column))
+        cell.font = Font(bold=True)
+        header_cell_list.append(cell)
+    sheet.append(header_cell_list)
+    for chunk in iter_chunks(df, columns):
+        for row in chunk.itertuples(index=index, name=None):
+            # Write missing values as empty cells
+            sheet.append([None if value != value else value for value in row])
+
+def write_csv(output_path, sheet_name, df, columns, index, writer=None):
+    with open(output_path, 'w', newline='') as fw:
+        for start, chunk in enumerate(iter_chunks(df, columns)):
+            chunk.to_csv(fw, header=(start == 0), index=index)
+        if len(df) == 0:
+            df.iloc[:0][columns].to_csv(fw, index=index)
+
+def write_jsonl(output_path, sheet_name, df, columns, index, writer=None):
+    with open(output_path, 'w') as fw:
+        for chunk in iter_chunks(df, columns):
+            if index:
+                chunk = chunk.reset_index()
+            fw.write(chunk.to_json(orient='records', lines=True).rstrip('\n'))
+            fw.write('\n')
+
+def write_parquet(output_path, sheet_name, df, columns, index, writer=None):
+    """
+    Write the rows into row groups of a Parquet file chunk by chunk
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    parquet_writer = None
+    try:
+        for chunk in iter_chunks(df, columns):
+            table = pa.Table.from_pandas(chunk, preserve_index=index)
+            if parquet_writer is None:
+                parquet_writer = pq.ParquetWriter(output_path, table.schema)
+            parquet_writer.write_table(table.cast(parquet_writer.schema))
+        if parquet_writer is None:
+            pq.write_table(pa.Table.from_pandas(to_dense(df.iloc[:0][columns]), preserve_index=index), output_path)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+def write_feather(output_path, sheet_name, df, columns, index, writer=None):
+    """
+    Write the rows into record batches of a Feather (Arrow IPC) file chunk by chunk
+    """
+    import pyarrow as pa
+    def to_table(chunk):
+        return pa.Table.from_pandas(chunk.reset_index() if index else chunk, preserve_index=False)
+    feather_writer = None
+    try:
+        for chunk in iter_chunks(df, columns):
+            table = to_table(chunk)
+            if feather_writer is None:
+                schema = table.schema
+                feather_writer = pa.ipc.new_file(output_path, schema)
+            feather_writer.write_table(table.cast(schema))
+        if feather_writer is None:
+            table = to_table(to_dense(df.iloc[:0][columns]))
+            feather_writer = pa.ipc.new_file(output_path, table.schema)
+            feather_writer.write_table(table)
+    finally:
+        if feather_writer is not None:
+            feather_writer.close()
+
+WRITER_DICT = {
+    'xlsx': write_xlsx
+    , 'csv': write_csv
+    , 'parquet': write_parquet
+    , 'jsonl': write_jsonl
+    , 'feather': write_feather
+}
+
+def write_sheets(output_path, sheet_list, output_format=None):
+    """
+    Write the sheets, each as a tuple of sheet name, dataframe, columns and whether to write the index
+    xlsx writes all sheets into one workbook, other formats write a file per sheet if there are many
+    Return the list of written paths
+    """
+    output_format = get_format(output_path, output_format)
+    writer_func = WRITER_DICT[output_format]
+    if output_format == 'xlsx':
+        from openpyxl import Workbook
+        output_path = get_output_path(output_path, output_format)
+        workbook = Workbook(write_only=True)
+        for sheet_name, df, columns, index in sheet_list:
+            writer_func(output_path, sheet_name, df, columns, index, workbook)
+        workbook.save(output_path)
+        return [output_path]
+
+    path_list = list()
+    for sheet_name, df, columns, index in sheet_list:
+        sheet_path = get_output_path(output_path, output_format, sheet_name if len(sheet_list) > 1 else None)
+        writer_func(sheet_path, sheet_name, df, columns, index)
+        path_list.append(sheet_path)
+    return path_list
+
+def read_sheet(output_path, index_column=None):
+    """
+    Read a sheet written by write_sheets, in the format by the file extension
+    """
+    output_format = get_format(output_path)
+    if output_format == 'parquet':
+        df = pd.read_parquet(output_path)
+        if index_column is not None and df.index.name == index_column:
+            return df
+    elif output_format == 'feather':
+        df = pd.read_feather(output_path)
+    elif output_format == 'csv':
+        df = pd.read_csv(output_path)
+    elif output_format == 'jsonl':
+        df = pd.read_json(output_path, orient='records', lines=True)
+    else:
+        df = pd.read_excel(output_path)
+    return df if index_column is None else df.set_index(index_column)
@@ -13,18 +13,24 @@ else:
     logging.basicConfig(level=logging.getLevelName(LOG_LEVEL))
 
 # Import essential libraries
+# lang_utils and stat_utils are imported by the stages using them, as nltk, pandas and pypdf are slow to import
 import arg_utils
+import cache_utils
 import file_utils
-import lang_utils
-import stat_utils
+import metric_utils
 import sys
 
-if __name__ == '__main__':
+class StageError(Exception):
     """
-    Main program starts
+    Error of the given input of a stage
     """
-    config_dict = file_utils.read_json('config.json')
-    parser = arg_utils.create_parser(
+    pass
+
+def get_parser(config_dict):
+    """
+    Create the parser of program arguments with the defaults of the configuration
+    """
+    return arg_utils.create_parser(
                 default_extract=config_dict['default_extract']
                 , default_filter=config_dict['default_filter']
                 , default_operator=config_dict['default_operator']
@@ -32,89 +38,260 @@ if __name__ == '__main__':
                 , default_out=config_dict['default_out']
                 , default_corrrate=str(config_dict['default_corrrate'])
                 , default_analysis=config_dict['default_analysis']
+                , default_workers=config_dict['default_workers']
+                , default_index=config_dict['default_index']
+                , default_skip_report=config_dict['default_skip_report']
+                , default_summary=config_dict['default_filter_summary']
+                , default_backend=config_dict['default_backend']
                 )
-    args = parser.parse_args()
+
+def get_extract_options(args):
+    """
+    Get the options of extracting the text of PDF files from the program arguments
+    """
+    import lang_utils
+    import pdf_utils
+    if not pdf_utils.is_available(args.backend):
+        raise StageError('the extraction backend {b} is not installed'.format(b=args.backend))
+    return lang_utils.get_extract_options(args.backend, args.first_pages, args.skip_references)
+
+def get_analyse_options(args):
+    """
+    Get the options of analysing word pairs from the program arguments
+    """
+    import stat_utils
+    for name in ['top_k', 'min_occurrence', 'min_files', 'sample_files']:
+        if getattr(args, name) is not None and getattr(args, name) < 1:
+            raise StageError('--{n} must be positive'.format(n=name.replace('_', '-')))
+    return stat_utils.get_analyse_options(args.top_k, args.min_occurrence, args.min_files, args.sample_files)
+
+def get_accuracy_message(count_dict):
+    """
+    Get the message of the accuracy of sampled correlations, or an empty string if they are not sampled
+    """
+    if 'analyse_sample_files' not in count_dict:
+        return ''
+    message = '\nCorrelations were screened on {s} files, with a mean absolute error of {m:.4f} and a max of {x:.4f} on {n} pairs'.format(
+        s=count_dict['analyse_sample_files'], m=count_dict.get('analyse_mean_abs_error', 0.0),
+        x=count_dict.get('analyse_max_abs_error', 0.0), n=count_dict['analyse_accuracy_pairs'])
+    if 'analyse_screen_recall' in count_dict:
+        message += ', where {r:.1%} of the correlated pairs passed the screen'.format(r=count_dict['analyse_screen_recall'])
+    message += '. {u} pairs of words rare in the sample were evaluated exactly without the screen'.format(u=count_dict['analyse_unsampled_pairs'])
+    return message + '.'
+
+def run_stages(args, config_dict):
+    """
+    Run the stages given by the program arguments, and write the metrics of the run if asked
+    Return the message of completion, or raise StageError if the given input does not exist
+    """
+    metrics = metric_utils.Metrics(args.profile)
+    try:
+        return run_timed_stages(args, config_dict, metrics)
+    finally:
+        metrics.end_stage()
+        if args.metrics is not None:
+            metrics.write(args.metrics)
+
+def run_timed_stages(args, config_dict, metrics):
+    """
+    Run the stages given by the program arguments, timing each stage by the metrics
+    Metrics of each file, pattern and pair are collected only if the metrics are written
+    """
+    if args.stage == 'index':
+        # Execute Index stage, which updates the corpus index by the changed files only
+        metrics.start_stage('index')
+        import index_utils
+        import lang_utils
+        import time
+        if args.pdf is not None and not os.path.exists(args.pdf):
+            raise StageError('The given path {p} does not exist.'.format(p=args.pdf))
+        # Files are named by their paths relative to the directory, and only a whole directory removes missing files
+        root_dir = args.pdf if args.pdf is not None and os.path.isdir(args.pdf) else None
+        if args.add is not None:
+            add_path_list = [os.path.join(root_dir or '', add_path) for add_path in args.add.split(',')]
+            for add_path in add_path_list:
+                if not os.path.isfile(add_path):
+                    raise StageError('The given file {p} does not exist.'.format(p=add_path))
+
+        exclude_list = file_utils.get_exclude_list(args.exclude)
+        extract_options = get_extract_options(args)
+        settings = index_utils.get_index_settings(args.authors, args.operator, config_dict, exclude_list, extract_options)
+        conn = index_utils.open_index(args.index, settings)
+        matcher = lang_utils.get_citation_matcher(args.authors, args.operator,
+                                                  config_dict['unnamed_patterns'], config_dict['named_patterns'], config_dict['named_year_patterns'])
+        cache_dir = None if args.no_cache else config_dict['cache_dir']
+        limits = lang_utils.get_limits(args.timeout, args.max_pages, args.max_memory, args.retry_pages)
+        is_changed = True
+        message_list = list()
+        if args.remove is not None:
+            index_utils.remove_files(conn, args.remove.split(','))
+            message_list.append('Removed {r} from index {i}.'.format(r=args.remove, i=args.index))
+        while True:
+            # The cache is read by every round, so it is bounded each round as in the extract stage
+            if cache_dir is not None:
+                cache_utils.evict_cache(cache_dir, config_dict['cache_max_mb'], config_dict['cache_max_age_days'])
+            if args.add is not None:
+                added, updated, removed = index_utils.sync_index(conn, add_path_list, matcher, exclude_list,
+                                                                 args.workers, cache_dir, False, limits,
+                                                                 extract_options, root_dir=root_dir)
+                is_changed = is_changed or added + updated > 0
+                message_list.append('Index {i} is updated: {a} added and {u} updated.'.format(i=args.index, a=added, u=updated))
+            elif args.pdf is not None:
+                file_info_dict = file_utils.get_pdf_file_dict(args.pdf, args.manifest, config_dict['discovery_threads'], args.rescan)
+                added, updated, removed = index_utils.sync_index(conn, list(file_info_dict), matcher, exclude_list,
+                                                                 args.workers, cache_dir, root_dir is not None, limits,
+                                                                 extract_options, file_info_dict, root_dir)
+                is_changed = is_changed or added + updated + removed > 0
+                message_list.append('Index {i} is updated: {a} added, {u} updated and {r} removed.'.format(i=args.index, a=added, u=updated, r=removed))
+            if args.export and is_changed:
+                out_path_list, analysis_path_list = index_utils.export_index(conn, args.filter, args.out, args.analysis,
+                                                                             float(args.corrrate), args.format,
+                                                                             get_analyse_options(args), metrics.count_dict)
+                message_list.append('Index {i} is exported to {f}, {o} and {d}.'.format(i=args.index, f=args.filter, o=', '.join(out_path_list), d=', '.join(analysis_path_list))
+                                    + get_accuracy_message(metrics.count_dict))
+            if not args.watch:
+                break
+            # Report each round while watching the directory for new or changed PDF files
+            print('\n'.join(message_list))
+            message_list = list()
+            is_changed = False
+            time.sleep(config_dict['watch_interval'])
+        return '\n'.join(message_list)
 
     if args.stage in ['all', 'extract']:
         # Execute Extraction stage
+        # In all stages, the files are extracted as the filter stage reads them, so the filter stage takes their time
+        metrics.start_stage('extract')
         if not os.path.exists(args.pdf):
-            # Exit when the given path does not exist
-            print('ERROR: The given path {p} does not exist.'.format(p=args.pdf))
-            sys.exit(-1)
+            # Stop when the given path does not exist
+            raise StageError('The given path {p} does not exist.'.format(p=args.pdf))
         
-        pdf_path_list = file_utils.get_pdf_files(args.pdf)        
-        pdf_tokens = lang_utils.get_path_tokens(pdf_path_list)
+        import lang_utils
+        # Files of the manifest if given come with their hashes, so they are not read again for the cache
+        file_info_dict = file_utils.get_pdf_file_dict(args.pdf, args.manifest, config_dict['discovery_threads'], args.rescan)
+        pdf_path_list = list(file_info_dict)
+        cache_dir = None if args.no_cache else config_dict['cache_dir']
+        if cache_dir is not None:
+            cache_utils.evict_cache(cache_dir, config_dict['cache_max_mb'], config_dict['cache_max_age_days'])
+        # Extract each file in an isolated process only if any limit is given
+        limits = lang_utils.get_limits(args.timeout, args.max_pages, args.max_memory, args.retry_pages)
+        pdf_tokens = lang_utils.iter_path_tokens(pdf_path_list, args.workers, cache_dir, args.rebuild_cache,
+                                                 limits, None if limits is None else args.skip_report,
+                                                 None if args.metrics is None else metrics.file_list,
+                                                 get_extract_options(args),
+                                                 {pdf_path: content_hash for pdf_path, (size, mtime, content_hash) in file_info_dict.items()})
 
-        # Save the dict into a text file
-        file_utils.write_output_extract(pdf_tokens, args.ext)
+        # Save the text of each file into a text file as soon as it is extracted
         if args.stage == 'extract':
-            print('Extracting text from {s} to {d} was complete.'.format(s=args.pdf, d=args.ext))
-            sys.exit(0)
+            file_utils.write_output_extract(pdf_tokens, args.ext)
+            return 'Extracting text from {s} to {d} was complete.'.format(s=args.pdf, d=args.ext)
+        # Hand over the text to the filter stage in memory while it is saved
+        text_pair_list = file_utils.iter_output_extract(pdf_tokens, args.ext)
     
     if args.stage in ['all', 'filter']:
         # Execute Filter stage
-        if not os.path.exists(args.ext):
-            print('ERROR: the given file {f} does not exist'.format(f=args.ext))
-            sys.exit(-1)
-        
-        text_pair_list = file_utils.read_text_file(args.ext)
-        filtered_pair = lang_utils.filter_citation(text_pair_list, args.authors, args.operator,
-                                                   config_dict['unnamed_patterns'], config_dict['named_patterns'], config_dict['named_year_patterns'])
+        metrics.start_stage('filter')
+        import lang_utils
+        import stat_utils
+        if args.stage == 'filter':
+            if not os.path.exists(args.ext):
+                raise StageError('the given file {f} does not exist'.format(f=args.ext))
+            text_pair_list = file_utils.read_text_file(args.ext)
+
+        if args.queries is not None:
+            # Filter the text for all queries of the file in one pass
+            if args.stage != 'filter' or not os.path.exists(args.queries):
+                raise StageError('the given queries {f} does not exist or is not in filter stage'.format(f=args.queries))
+            query_list = file_utils.read_query_file(args.queries, args.operator)
+            filtered_pair_lists = lang_utils.filter_queries(text_pair_list, query_list,
+                                                            config_dict['unnamed_patterns'], config_dict['named_patterns'], config_dict['named_year_patterns'],
+                                                            args.workers)
+            if args.combined:
+                file_utils.write_output_queries(query_list, filtered_pair_lists, args.filter)
+            else:
+                for query_idx, filtered_pair in enumerate(filtered_pair_lists):
+                    file_utils.write_output_filter(filtered_pair, file_utils.get_query_output_path(args.filter, query_idx))
+            return 'Filtering text from {s} for {n} queries of {q} was complete.'.format(s=args.ext, n=len(query_list), q=args.queries)
+
+        citation_list = lang_utils.scan_citation(text_pair_list, args.authors, args.operator,
+                                                 config_dict['unnamed_patterns'], config_dict['named_patterns'], config_dict['named_year_patterns'],
+                                                 args.workers, None if args.metrics is None else metrics.pattern_dict)
+        filtered_pair = [text_pair for text_pair, match_list in citation_list]
+        metrics.count_dict['filter_sentences'] = len(filtered_pair)
 
         # Save the pair into a text file
         file_utils.write_output_filter(filtered_pair, args.filter)
-        stat_utils.write_excel_filter_summary(filtered_pair, config_dict['unnamed_patterns'], config_dict['default_filter_summary'])
+        stat_utils.write_excel_filter_summary(citation_list, args.summary, args.format)
         if args.stage == 'filter':
-            print('Filtering text from {s} to {d} was complete.'.format(s=args.ext, d=args.filter))
-            sys.exit(0)
+            return 'Filtering text from {s} to {d} was complete.'.format(s=args.ext, d=args.filter)
     
     if args.stage in ['all', 'count']:
         # Execute Count (Statistics) stage
-        if not os.path.exists(args.filter):
-            print('ERROR: the given file {f} does not exist'.format(f=args.filter))
-            sys.exit(-1)
-        
-        text_pair_list = file_utils.read_text_file(args.filter)
+        metrics.start_stage('count')
+        import lang_utils
+        import output_utils
+        import stat_utils
+        if args.stage == 'count':
+            if not os.path.exists(args.filter):
+                raise StageError('the given file {f} does not exist'.format(f=args.filter))
+            filtered_pair = file_utils.read_text_file(args.filter)
+
         exclude_list = file_utils.get_exclude_list(args.exclude)
-        file_tokens_dict = lang_utils.get_file_tokens(text_pair_list, exclude_list)
+        file_tokens_dict = lang_utils.get_file_tokens(filtered_pair, exclude_list, args.workers)
         result_df = stat_utils.merge_dataframes(file_tokens_dict)
 
         # Get file column list
         pdf_file_list = list(result_df.columns)
+        metrics.count_dict.update({'count_words': len(result_df), 'count_files': len(pdf_file_list)})
         
         # Count Syllables
-        result_df['syllables'] = result_df.index.map(lang_utils.count_syllables)
-        # Count non-zero columns
-        result_df['file_count'] = (result_df[pdf_file_list] > 0).sum(axis=1)
-        # Total occurrence
-        result_df['occurrence'] = result_df[pdf_file_list].sum(axis=1)
-
-        # Save the dataframe into an Excel file
-        stat_utils.write_excel_word_counts(result_df, args.out, ['syllables', 'file_count', 'occurrence'], pdf_file_list)
+        result_df['syllables'] = lang_utils.count_syllables_batch(result_df.index)
+        # Count non-zero columns and total occurrence
+        stat_utils.add_word_summary(result_df, pdf_file_list)
+
+        # Save the dataframe into a file of the given format
+        out_path = output_utils.get_output_path(args.out, args.format)
+        stat_utils.write_word_counts(result_df, out_path, ['syllables', 'file_count', 'occurrence'], pdf_file_list, args.format)
         if args.stage == 'count':
-            print('Statatics of {s} is saved in {d} completely.'.format(s=args.filter, d=args.out))
+            return 'Statatics of {s} is saved in {d} completely.'.format(s=args.filter, d=out_path)
     
     if args.stage in ['all', 'analyse']:
         # Execute Pair Analysis stage
-        if not os.path.exists(args.out):
-            print('ERROR: the given file {f} does not exist'.format(f=args.out))
-            sys.exit(-1)
-        
-        output_df = stat_utils.read_output(args.out)
+        metrics.start_stage('analyse')
+        import output_utils
+        import stat_utils
+        out_path = output_utils.get_output_path(args.out, args.format)
+        analysis_path = output_utils.get_output_path(args.analysis, args.format)
+        if args.stage == 'analyse':
+            if not os.path.exists(out_path):
+                raise StageError('the given file {f} does not exist'.format(f=out_path))
+            result_df = stat_utils.read_output(out_path)
+            # Read File of File-Text
+            filtered_pair = file_utils.read_text_file(args.filter)
+
         # Get file column list
-        pdf_file_list = [column for column in list(output_df.columns) if column not in ['syllables', 'file_count', 'occurrence']]
-        # Read File of File-Text
-        text_pair_list = file_utils.read_text_file(args.filter)
+        pdf_file_list = [column for column in list(result_df.columns) if column not in ['syllables', 'file_count', 'occurrence']]
         # Pair analysis
-        paired_df = stat_utils.analyse_pair(output_df, pdf_file_list, float(args.corrrate), text_pair_list)
-        # Count non-zero columns
-        paired_df['file_count'] = (paired_df[pdf_file_list] > 0).sum(axis=1)
-        # Total occurrence
-        paired_df['occurrence'] = paired_df[pdf_file_list].sum(axis=1)        
-        stat_utils.write_excel_paired_analysis(paired_df, args.analysis, ['word_1', 'word_2', 'correlation', 'file_count', 'occurrence'], pdf_file_list)
+        # Pairs come with their number of files and total occurrence
+        paired_df = stat_utils.analyse_pair(result_df, pdf_file_list, float(args.corrrate), filtered_pair,
+                                            count_dict=metrics.count_dict, **get_analyse_options(args))
+        stat_utils.write_excel_paired_analysis(paired_df, analysis_path, ['word_1', 'word_2', 'correlation', 'file_count', 'occurrence'], pdf_file_list, args.format)
         if args.stage == 'analyse':
-            print('Analysis of {s} is saved in {d} completely.'.format(s=args.out, d=args.analysis))
-        else:
-            # Final output message
-            print('All processes done. Analysis of {s} is saved {o} and {d} completely.'.format(s=args.pdf, o=args.out, d=args.analysis))
-    
+            return 'Analysis of {s} is saved in {d} completely.'.format(s=out_path, d=analysis_path) + get_accuracy_message(metrics.count_dict)
+        # Final output message
+        return 'All processes done. Analysis of {s} is saved {o} and {d} completely.'.format(s=args.pdf, o=out_path, d=analysis_path) \
+            + get_accuracy_message(metrics.count_dict)
+
+if __name__ == '__main__':
+    """
+    Main program starts
+    """
+    config_dict = file_utils.read_json('config.json')
+    args = get_parser(config_dict).parse_args()
+    try:
+        message = run_stages(args, config_dict)
+    except StageError as e:
+        print('ERROR: {m}'.format(m=e))
+        sys.exit(-1)
+    if message:
+        print(message)
@@ -0,0 +1,209 @@
+"""
+PDF Extractor Service Program
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import arg_utils
+import file_utils
+import json
+import logging
+import os
+import pdf_extractor    # Logging is defined by the main program
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+# Configuration of the jobs, set once per worker process
+_config_dict = None
+
+def init_worker(config_dict):
+    """
+    Load the libraries and the language data once per worker process, so that jobs do not pay for them
+    """
+    global _config_dict
+    _config_dict = config_dict
+    import lang_utils
+    import output_utils
+    import stat_utils
+    lang_utils.warm_up()
+
+def run_job(arg_list):
+    """
+    Run the stages of the given program arguments in a worker process
+    Return the status, which is done, error or failed, and the message
+    """
+    try:
+        args = pdf_extractor.get_parser(_config_dict).parse_args(arg_list)
+    except SystemExit:
+        return 'error', 'invalid arguments {a}'.format(a=' '.join(arg_list))
+    if args.stage == 'index' and args.watch:
+        return 'error', 'watching the index is not supported by the service'
+    try:
+        return 'done', pdf_extractor.run_stages(args, _config_dict)
+    except pdf_extractor.StageError as e:
+        return 'error', str(e)
+    except:
+        logging.exception('Failed to run job {a}'.format(a=arg_list))
+        return 'failed', 'failed to run job {a}'.format(a=' '.join(arg_list))
+
+class JobService:
+    """
+    Pool of warm worker processes running jobs, which rejects jobs when the queue is full
+    The pool is started again when a worker process dies, such as by the out of memory killer
+    """
+    def __init__(self, config_dict, workers=2, queue_size=8):
+        self.config_dict = config_dict
+        self.workers = workers
+        self.restarts = 0
+        self.lock = threading.Lock()
+        # Slots of the running and the queued jobs
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.executor = self.start_pool()
+
+    def start_pool(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker, initargs=(self.config_dict, ))
+        # Start all workers now, so that the first jobs do not wait for warming up
+        wait([executor.submit(os.getpid) for _ in range(self.workers)])
+        return executor
+
+    def restart_pool(self, broken_executor):
+        """
+        Replace the pool broken by a dead worker process, unless another job has replaced it already
+        """
+        with self.lock:
+            if self.executor is not broken_executor:
+                return
+            broken_executor.shutdown(wait=False)
+            self.executor = self.start_pool()
+            self.restarts += 1
+
+    def is_broken(self):
+        # A pool is broken for good once any of its worker processes dies, even between jobs
+        return bool(getattr(self.executor, '_broken', False))
+
+    def run(self, arg_list):
+        """
+        Run a job and wait for its status and message, or return None at once if the queue is full
+        """
+        if not self.slots.acquire(blocking=False):
+            return None
+        try:
+            if self.is_broken():
+                self.restart_pool(self.executor)
+            executor = self.executor
+            try:
+                future = executor.submit(run_job, arg_list)
+            except BrokenProcessPool:
+                # The job did not start, so it is submitted to a new pool
+                self.restart_pool(executor)
+                executor = self.executor
+                future = executor.submit(run_job, arg_list)
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                logging.exception('Worker process died while running job {a}'.format(a=arg_list))
+                self.restart_pool(executor)
+                return 'failed', 'a worker process died while running job {a}'.format(a=' '.join(arg_list))
+        finally:
+            self.slots.release()
+
+    def get_health(self):
+        return {
+            'status': 'broken' if self.is_broken() else 'ok'
+            , 'workers': self.workers
+            , 'restarts': self.restarts
+        }
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+class JobHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the HTTP API of the service
+    POST /jobs with {"args": [program arguments]} runs a job, and GET /health checks the pool of the service
+    """
+    def do_GET(self):
+        if self.path == '/health':
+            health_dict = self.server.service.get_health()
+            self.send_json(200 if health_dict['status'] == 'ok' else 503, health_dict)
+        else:
+            self.send_json(404, {'status': 'error', 'message': 'unknown path {p}'.format(p=self.path)})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            self.send_json(404, {'status': 'error', 'message': 'unknown path {p}'.format(p=self.path)})
+            return
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            arg_list = json.loads(self.rfile.read(content_length))['args']
+            if not isinstance(arg_list, list) or not all(isinstance(arg, str) for arg in arg_list):
+                raise TypeError('args is not a list of strings')
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {'status': 'error', 'message': 'the job is not {"args": [program arguments]}'})
+            return
+        result = self.server.service.run(arg_list)
+        if result is None:
+            self.send_json(503, {'status': 'busy', 'message': 'the queue of jobs is full'})
+            return
+        status, message = result
+        self.send_json({'done': 200, 'error': 400}.get(status, 500), {'status': status, 'message': message})
+
+    def send_json(self, code, body_dict):
+        body = json.dumps(body_dict).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Clients of a unix socket have no address
+        return self.client_address[0] if self.client_address else 'local'
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+def create_server(service, host='127.0.0.1', port=8765, socket_path=None):
+    """
+    Create the HTTP server of the service, on the unix socket if given, or on the host and the port
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, JobHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), JobHandler)
+    server.service = service
+    return server
+
+if __name__ == '__main__':
+    """
+    Service program starts
+    """
+    config_dict = file_utils.read_json('config.json')
+    parser = arg_utils.create_service_parser(
+                default_host=config_dict['service_host']
+                , default_port=config_dict['service_port']
+                , default_workers=config_dict['service_workers']
+                , default_queue_size=config_dict['service_queue_size']
+                )
+    args = parser.parse_args()
+    if args.workers < 1 or args.queue_size < 0:
+        print('ERROR: the number of workers must be positive and the queue size must not be negative')
+        sys.exit(-1)
+
+    service = JobService(config_dict, args.workers, args.queue_size)
+    server = create_server(service, args.host, args.port, args.socket)
+    print('Service of {w} workers is listening on {a}.'.format(w=args.workers, a=args.socket or '{h}:{p}'.format(h=args.host, p=args.port)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.remove(args.socket)
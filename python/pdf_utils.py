@@ -0,0 +1,94 @@
+"""
+PDF Utilities
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+from itertools import islice
+
+def import_pymupdf():
+    """
+    Import PyMuPDF, which is named fitz before version 1.24
+    """
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf
+    return pymupdf
+
+class PypdfBackend:
+    """
+    Extraction of the text of each page by pypdf
+    """
+    # Orientations of the text to extract, where pypdf extracts all by default
+    orientations = (0, 90, 180, 270)
+
+    def __init__(self, pdf_path):
+        from pypdf import PdfReader
+        self.reader = PdfReader(pdf_path)
+
+    def get_page_count(self):
+        return len(self.reader.pages)
+
+    def iter_pages(self, page_limit=None):
+        """
+        Yield the text of each page, up to page_limit pages if given
+        """
+        for page in islice(self.reader.pages, page_limit):
+            yield page.extract_text(orientations=self.orientations)
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def get_version():
+        import pypdf
+        return pypdf.__version__
+
+class UprightPypdfBackend(PypdfBackend):
+    """
+    Extraction of upright text only by pypdf, which skips rotated text such as stamps in the margin
+    """
+    orientations = (0, )
+
+class PymupdfBackend:
+    """
+    Extraction of the text of each page by PyMuPDF, which is much faster than pypdf if it is installed
+    """
+    def __init__(self, pdf_path):
+        self.document = import_pymupdf().open(pdf_path)
+
+    def get_page_count(self):
+        return self.document.page_count
+
+    def iter_pages(self, page_limit=None):
+        for page in islice(self.document, page_limit):
+            yield page.get_text()
+
+    def close(self):
+        self.document.close()
+
+    @staticmethod
+    def get_version():
+        return import_pymupdf().VersionBind
+
+BACKEND_DICT = {
+    'pypdf': PypdfBackend
+    , 'pypdf-upright': UprightPypdfBackend
+    , 'pymupdf': PymupdfBackend
+}
+
+def is_available(backend):
+    """
+    Whether the library of the given extraction backend is installed
+    """
+    try:
+        BACKEND_DICT[backend].get_version()
+    except ImportError:
+        return False
+    return True
+
+def open_pdf(pdf_path, backend='pypdf'):
+    """
+    Open the PDF file by the given extraction backend
+    """
+    return BACKEND_DICT[backend](pdf_path)
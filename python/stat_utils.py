@@ -3,105 +3,417 @@ Statistics Utilities
 @author     Teki Chan
 @since      30 Jan 2024
 """
-from nltk.probability import FreqDist
+from collections import Counter
+import heapq
+import numpy as np
+import output_utils
 import pandas as pd
-from itertools import combinations
 import re
 
-def create_dataframe(freq):
-    df = pd.DataFrame.from_dict(freq).reset_index()
-    df.columns = ['index', 'word', 'count']
-    df.set_index('word', inplace=True)
-    df = df.drop('index', axis=1)
-    return df
+# Words, and separators allowed between the words of a pair
+WORD_RE = re.compile(r'\w+')
+SEPARATOR_RE = re.compile(r'[\s,-]*')
+
+# Sampled correlations are screened this much below the rate, so that pairs near the rate are evaluated exactly
+SAMPLE_MARGIN = 0.1
+# Words in less sampled files than this are not screened by the sample, but evaluated exactly
+SAMPLE_SUPPORT = 3
+# Seed of sampling the files and the pairs, so that a sampled analysis is repeatable
+SAMPLE_SEED = 0
+# Number of pairs evaluated both exactly and by the sample for the accuracy report
+ACCURACY_PAIRS = 10000
+# Number of entries of the sparse rows looked up at once in correlating pairs, which bounds the memory
+LOOKUP_SIZE = 1 << 22
+
+def build_count_matrix(file_tokens_dict):
+    """
+    Count the tokens of each file into a sparse word by file matrix in COO form
+    Return the sorted vocabulary, and the arrays of word positions, file positions and counts
+    """
+    word_pos_dict = dict()
+    row_list = list()
+    col_list = list()
+    count_list = list()
+    for col, tokens in enumerate(file_tokens_dict.values()):
+        for word, count in Counter(tokens).items():
+            row_list.append(word_pos_dict.setdefault(word, len(word_pos_dict)))
+            col_list.append(col)
+            count_list.append(count)
+
+    # Renumber words in sorted order of the vocabulary
+    word_list = sorted(word_pos_dict)
+    sorted_pos = np.empty(len(word_list), dtype=np.int64)
+    for pos, word in enumerate(word_list):
+        sorted_pos[word_pos_dict[word]] = pos
+    rows = sorted_pos[np.array(row_list, dtype=np.int64)]
+    return word_list, rows, np.array(col_list, dtype=np.int64), np.array(count_list, dtype=np.int64)
+
+def merge_dataframes(file_tokens_dict, dense=False):
+    """
+    Merge the word counts of files into a word by file dataframe
+    File columns are sparse with zero fill unless dense is requested
+    """
+    word_list, rows, cols, counts = build_count_matrix(file_tokens_dict)
+    # Entries are grouped by file in order, so each file is a slice of the arrays
+    bounds = np.searchsorted(cols, np.arange(len(file_tokens_dict) + 1))
+    column_dict = dict()
+    for col, filename in enumerate(file_tokens_dict.keys()):
+        in_file = slice(bounds[col], bounds[col + 1])
+        column = np.zeros(len(word_list), dtype=np.int64)
+        column[rows[in_file]] = counts[in_file]
+        column_dict[filename] = column if dense else pd.arrays.SparseArray(column, fill_value=0)
+    return pd.DataFrame(column_dict, index=pd.Index(word_list, name='word'))
+
+def get_column_entries(df, file_name):
+    """
+    Get the positions and the counts of the non-zero entries of a file column, without densifying a sparse column
+    """
+    column = df[file_name].array
+    if isinstance(column, pd.arrays.SparseArray) and column.fill_value == 0:
+        indices = column.sp_index.indices
+        values = column.sp_values
+    else:
+        values = np.asarray(column)
+        indices = np.flatnonzero(values)
+        values = values[indices]
+    return indices, values
 
-def merge_dataframes(file_tokens_dict):
-    file_df_dict = dict()
-    for filename, tokens in file_tokens_dict.items():
-        # Produce frequency distribution
-        freq = FreqDist(tokens).most_common()
-        file_df_dict[filename] = create_dataframe(freq)
-    merged_df = pd.concat(file_df_dict.values(), axis=1)
-    merged_df.columns = file_df_dict.keys()
-    merged_df.fillna(0, inplace=True)
-    merged_df.sort_index(inplace=True)
-    return merged_df
+def get_word_summary(df, file_list):
+    """
+    Get the number of files containing each word and its total occurrence,
+    read from the non-zero entries of the file columns
+    """
+    file_count = np.zeros(len(df), dtype=np.int64)
+    occurrence = np.zeros(len(df), dtype=np.int64)
+    for file_name in file_list:
+        indices, values = get_column_entries(df, file_name)
+        file_count[indices] += values > 0
+        occurrence[indices] += values.astype(np.int64)
+    return file_count, occurrence
+
+def add_word_summary(df, file_list):
+    """
+    Add the number of files containing each word and its total occurrence
+    """
+    file_count, occurrence = get_word_summary(df, file_list)
+    df['file_count'] = file_count
+    df['occurrence'] = occurrence
+    return df
 
 def read_output(output_path):
-    df = pd.read_excel(output_path)
-    return df.set_index('word')
-
-def analyse_pair(df, pdf_file_list, min_corr_rate, text_pair_list):
-    # Find all word pairs which appear in at least one of files
-    word_pair_set = set()
-    for file_name in pdf_file_list:
-        word_pair_set.update({comb for comb in combinations(df[df[file_name] > 0].index, r=2)})
-    
-    # Filter those 
-    word_pair_list = list()
-    for comb in word_pair_set:
-        comb_re1 = str(comb[0]) + r'[\s,-]*' + str(comb[1])
-        comb_re2 = str(comb[1]) + r'[\s,-]*' + str(comb[0])
-        for text_pair in text_pair_list:
-            if re.search(comb_re1, text_pair[1]) or \
-                re.search(comb_re2, text_pair[1]):
-                word_pair_list.append(comb)
-                break
-
-    # Build the result of analysis
+    """
+    Read the word counts, in the format by the file extension
+    """
+    return output_utils.read_sheet(output_path, 'word')
+
+def build_pair_index(text_pair_list, word_pos_dict):
+    r"""
+    Index the occurrences of adjacent word pairs in each file, where only whitespaces,
+    commas or hyphens are between the words, i.e. word_1[\s,-]*word_2 or word_2[\s,-]*word_1
+    Pairs are keyed by the positions of the words in word_pos_dict, in ascending order
+    """
+    pair_index = dict()
+    for text_pair in text_pair_list:
+        file_name = text_pair[0]
+        text = text_pair[1]
+        last_pos = None
+        last_end = 0
+        for matched in WORD_RE.finditer(text):
+            pos = word_pos_dict.get(matched.group())
+            if pos is not None and last_pos is not None and pos != last_pos and \
+                SEPARATOR_RE.fullmatch(text, last_end, matched.start()):
+                pair = (last_pos, pos) if last_pos < pos else (pos, last_pos)
+                file_occurrence_dict = pair_index.setdefault(pair, dict())
+                file_occurrence_dict[file_name] = file_occurrence_dict.get(file_name, 0) + 1
+            last_pos = pos
+            last_end = matched.end()
+    return pair_index
+
+class SparseCounts:
+    """
+    Word by file counts in compressed sparse rows, which correlate pairs of words without a dense matrix
+    """
+    def __init__(self, indptr, indices, data, column_count):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.column_count = column_count
+        self.row_lengths = np.diff(indptr)
+        row_ids = np.repeat(np.arange(len(self.row_lengths)), self.row_lengths)
+        # Keys of the entries in ascending order, to look up the entry of a row and a column
+        self.keys = row_ids * column_count + indices
+        self.sums = np.bincount(row_ids, weights=data, minlength=len(self.row_lengths))
+        # Number of columns times the sum of squared deviations of each row from its mean, exact for counts
+        self.spreads = column_count * np.bincount(row_ids, weights=data * data, minlength=len(self.row_lengths)) - self.sums * self.sums
+
+    @classmethod
+    def from_dataframe(cls, df, file_list):
+        row_list = list()
+        col_list = list()
+        count_list = list()
+        for col, file_name in enumerate(file_list):
+            indices, values = get_column_entries(df, file_name)
+            is_non_zero = values != 0
+            row_list.append(indices[is_non_zero])
+            col_list.append(np.full(is_non_zero.sum(), col, dtype=np.int64))
+            count_list.append(values[is_non_zero].astype(np.float64))
+        rows = np.concatenate(row_list) if row_list else np.zeros(0, dtype=np.int64)
+        cols = np.concatenate(col_list) if col_list else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate(count_list) if count_list else np.zeros(0)
+        order = np.lexsort((cols, rows))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(df)))])
+        return cls(indptr, cols[order], counts[order], len(file_list))
+
+    def select_columns(self, col_array):
+        """
+        Get the counts of the given columns only, renumbered in the given order
+        """
+        col_pos = np.full(self.column_count, -1, dtype=np.int64)
+        col_pos[col_array] = np.arange(len(col_array))
+        is_kept = col_pos[self.indices] >= 0
+        row_ids = np.repeat(np.arange(len(self.row_lengths)), self.row_lengths)
+        kept_lengths = np.bincount(row_ids[is_kept], minlength=len(self.row_lengths))
+        indptr = np.concatenate([[0], np.cumsum(kept_lengths)])
+        # Entries of each row are sorted again by the new column positions, as the keys are looked up in order
+        cols = col_pos[self.indices[is_kept]]
+        order = np.lexsort((cols, row_ids[is_kept]))
+        return SparseCounts(indptr, cols[order], self.data[is_kept][order], len(col_array))
+
+    def get_pair_products(self, pair_array):
+        """
+        Sum of the products of the two rows of each pair, and whether both rows are non-zero in any column
+        Entries of the shorter row of each pair are looked up in the other row
+        """
+        first = pair_array[:, 0]
+        second = pair_array[:, 1]
+        is_swapped = self.row_lengths[first] > self.row_lengths[second]
+        short_rows = np.where(is_swapped, second, first)
+        long_rows = np.where(is_swapped, first, second)
+        lengths = self.row_lengths[short_rows]
+        pair_ids = np.repeat(np.arange(len(pair_array)), lengths)
+        entry_ids = np.repeat(self.indptr[short_rows] - np.cumsum(lengths) + lengths, lengths) + np.arange(len(pair_ids))
+        wanted_keys = long_rows[pair_ids] * self.column_count + self.indices[entry_ids]
+        found_ids = np.minimum(np.searchsorted(self.keys, wanted_keys), max(len(self.keys) - 1, 0))
+        is_found = self.keys[found_ids] == wanted_keys if len(self.keys) > 0 else np.zeros(len(wanted_keys), dtype=bool)
+        found_pair_ids = pair_ids[is_found]
+        products = np.bincount(found_pair_ids, weights=self.data[entry_ids[is_found]] * self.data[found_ids[is_found]],
+                               minlength=len(pair_array))
+        return products, np.bincount(found_pair_ids, minlength=len(pair_array)) > 0
+
+    def get_pair_correlations(self, pair_array):
+        """
+        Pearson correlations of the pairs of rows, and whether both rows of each pair are non-zero in any column
+        Rows without variance have no correlation, i.e. NaN
+        """
+        products = np.zeros(len(pair_array))
+        is_together = np.zeros(len(pair_array), dtype=bool)
+        # Pairs are split by the number of entries to look up, so that a chunk of common words does not take much memory
+        lookups = np.cumsum(np.minimum(self.row_lengths[pair_array[:, 0]], self.row_lengths[pair_array[:, 1]]))
+        bounds = np.searchsorted(lookups, np.arange(0, lookups[-1] if len(lookups) > 0 else 0, LOOKUP_SIZE), side='right')
+        bounds = np.unique(np.concatenate([[0], bounds, [len(pair_array)]]))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            products[start:end], is_together[start:end] = self.get_pair_products(pair_array[start:end])
+        first_sums = self.sums[pair_array[:, 0]]
+        second_sums = self.sums[pair_array[:, 1]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr_rates = (self.column_count * products - first_sums * second_sums) / \
+                np.sqrt(self.spreads[pair_array[:, 0]] * self.spreads[pair_array[:, 1]])
+        return corr_rates, is_together
+
+def prune_words(df, pdf_file_list, min_occurrence=None, min_files=None):
+    """
+    Keep the words which occur at least min_occurrence times in at least min_files files, if given
+    """
+    if min_occurrence is None and min_files is None:
+        return df
+    if 'file_count' in df.columns and 'occurrence' in df.columns:
+        file_count, occurrence = df['file_count'].to_numpy(), df['occurrence'].to_numpy()
+    else:
+        file_count, occurrence = get_word_summary(df, pdf_file_list)
+    is_kept = (occurrence >= (min_occurrence or 0)) & (file_count >= (min_files or 0))
+    return df.iloc[np.flatnonzero(is_kept)]
+
+def screen_pairs(sample_counts, pair_array, min_corr_rate):
+    """
+    Screen the pairs by their correlations in the sample
+    A pair is not screened but passed if either word is in less than SAMPLE_SUPPORT sampled files, as the sample
+    tells little about a rare word, which is often missing from every sampled file
+    Return the sampled correlations, whether each pair passes and whether each pair is passed unscreened
+    """
+    sample_rates = sample_counts.get_pair_correlations(pair_array)[0]
+    is_unsampled = np.isnan(sample_rates) | \
+        (np.minimum(sample_counts.row_lengths[pair_array[:, 0]], sample_counts.row_lengths[pair_array[:, 1]]) < SAMPLE_SUPPORT)
+    return sample_rates, is_unsampled | (sample_rates >= min_corr_rate - SAMPLE_MARGIN), is_unsampled
+
+def get_sample_accuracy(counts, sample_counts, pair_list, min_corr_rate):
+    """
+    Compare the sampled correlations with the exact ones on a random subset of the pairs
+    Return the number of compared pairs, the mean and the max absolute errors, and the share of the pairs correlated
+    at least the rate which pass the screen if there is any of them
+    """
+    if len(pair_list) == 0:
+        return {'analyse_accuracy_pairs': 0}
+    rng = np.random.default_rng(SAMPLE_SEED)
+    pair_array = np.array(pair_list, dtype=np.int64)[rng.permutation(len(pair_list))[:ACCURACY_PAIRS]]
+    exact_rates = counts.get_pair_correlations(pair_array)[0]
+    sample_rates, is_passed, is_unsampled = screen_pairs(sample_counts, pair_array, min_corr_rate)
+    errors = np.abs(exact_rates - sample_rates)
+    errors = errors[~np.isnan(errors)]
+    accuracy_dict = {
+        'analyse_accuracy_pairs': len(pair_array)
+        , 'analyse_mean_abs_error': float(errors.mean()) if len(errors) > 0 else 0.0
+        , 'analyse_max_abs_error': float(errors.max()) if len(errors) > 0 else 0.0
+    }
+    is_correlated = exact_rates >= min_corr_rate
+    if is_correlated.any():
+        accuracy_dict['analyse_screen_recall'] = float(is_passed[is_correlated].mean())
+    return accuracy_dict
+
+def get_analyse_options(top_k=None, min_occurrence=None, min_files=None, sample_files=None):
+    """
+    Get the options of analysing word pairs, which bound the analysis of huge vocabularies
+    """
+    return {
+        'top_k': top_k
+        , 'min_occurrence': min_occurrence
+        , 'min_files': min_files
+        , 'sample_files': sample_files
+    }
+
+def analyse_pair(df, pdf_file_list, min_corr_rate, text_pair_list, chunk_size=100000, pair_counts=None, count_dict=None,
+                 top_k=None, min_occurrence=None, min_files=None, sample_files=None):
+    """
+    Analyse the correlation of adjacent word pairs
+    The occurrences of pairs in each file are indexed from the text, unless given as pair_counts
+    keyed by word pairs
+    Words occurring less than min_occurrence times or in less than min_files files are not paired, and only
+    the top_k most correlated pairs are kept in descending order of correlation, if given
+    Correlations are screened on a sample of sample_files files if given, where the pairs passing the screen
+    and the pairs of words rare in the sample are evaluated exactly, and the accuracy of the screen is set into count_dict
+    The numbers of words, candidate pairs and correlated pairs are set into count_dict if given
+    """
+    df = prune_words(df, pdf_file_list, min_occurrence, min_files)
+    # Index adjacent word pairs of the text once, instead of scanning the text for every pair
+    word_list = list(df.index)
+    word_pos_dict = {str(word): pos for pos, word in enumerate(word_list)}
+    if pair_counts is None:
+        pair_index = build_pair_index(text_pair_list, word_pos_dict)
+    else:
+        pair_index = dict()
+        for (word_1, word_2), file_occurrence_dict in pair_counts.items():
+            if word_1 in word_pos_dict and word_2 in word_pos_dict:
+                pair = tuple(sorted((word_pos_dict[word_1], word_pos_dict[word_2])))
+                pair_index[pair] = file_occurrence_dict
+    if pair_counts is None:
+        text_file_list = list(dict.fromkeys(text_pair[0] for text_pair in text_pair_list))
+    else:
+        text_file_list = list(pdf_file_list)
+
+    # Word by file counts in sparse rows, as a dense matrix of a huge vocabulary does not fit in memory
+    counts = SparseCounts.from_dataframe(df, pdf_file_list)
+    pair_list = sorted(pair_index.keys())
+    is_sampled = sample_files is not None and sample_files < len(pdf_file_list)
+    if is_sampled:
+        sample_cols = np.sort(np.random.default_rng(SAMPLE_SEED).choice(len(pdf_file_list), sample_files, replace=False))
+        sample_counts = counts.select_columns(sample_cols)
+
+    # Keep the pairs of words which appear together in at least one of files,
+    # and correlate at least the given rate, evaluated chunk by chunk to bound the memory
+    # With top_k, a heap of the best pairs so far bounds the result as well
+    selected_list = []
+    screened = 0
+    unsampled = 0
+    for start in range(0, len(pair_list), chunk_size):
+        chunk_list = pair_list[start:start + chunk_size]
+        pair_array = np.array(chunk_list, dtype=np.int64)
+        if is_sampled:
+            corr_rates = np.full(len(chunk_list), np.nan)
+            is_together = np.zeros(len(chunk_list), dtype=bool)
+            sample_rates, is_passed, is_unsampled = screen_pairs(sample_counts, pair_array, min_corr_rate)
+            screened_idx = np.flatnonzero(is_passed)
+            corr_rates[screened_idx], is_together[screened_idx] = counts.get_pair_correlations(pair_array[screened_idx])
+            screened += len(screened_idx)
+            unsampled += int(is_unsampled.sum())
+        else:
+            corr_rates, is_together = counts.get_pair_correlations(pair_array)
+        correlated_idx = np.flatnonzero(is_together & (corr_rates >= min_corr_rate))
+        if top_k is None:
+            selected_list.extend((corr_rates[idx], chunk_list[idx]) for idx in correlated_idx)
+            continue
+        if len(correlated_idx) > top_k:
+            correlated_idx = correlated_idx[np.argpartition(-corr_rates[correlated_idx], top_k - 1)[:top_k]]
+        for idx in correlated_idx:
+            if len(selected_list) < top_k:
+                heapq.heappush(selected_list, (corr_rates[idx], chunk_list[idx]))
+            else:
+                heapq.heappushpop(selected_list, (corr_rates[idx], chunk_list[idx]))
+    if top_k is not None:
+        selected_list.sort(key=lambda selected: (-selected[0], selected[1]))
+
     result_list = []
-    for comb in word_pair_list:
-        corr_rate = df[pdf_file_list].loc[comb[0]].corr(df[pdf_file_list].loc[comb[1]])
-        if corr_rate >= min_corr_rate:
-            row = {
-                'word_1': comb[0]
-                , 'word_2': comb[1]
-                , 'correlation': corr_rate
-            }
-            comb_re1 = str(comb[0]) + r'[\s,-]*' + str(comb[1])
-            comb_re2 = str(comb[1]) + r'[\s,-]*' + str(comb[0])
-            file_occurrence_dict = dict()
-            for text_pair in text_pair_list:
-                file_name = text_pair[0]
-                text = text_pair[1]
-                ocr = len(re.findall(comb_re1, text)) + len(re.findall(comb_re2, text))
-                file_occurrence_dict[file_name] = file_occurrence_dict.get(file_name, 0) + ocr
-            row.update(file_occurrence_dict)
-            result_list.append(row)
-    return pd.DataFrame.from_records(result_list)
+    for corr_rate, pair in selected_list:
+        file_occurrence_dict = pair_index[pair]
+        row = {
+            'word_1': word_list[pair[0]]
+            , 'word_2': word_list[pair[1]]
+            , 'correlation': corr_rate
+            , 'file_count': sum(1 for count in file_occurrence_dict.values() if count > 0)
+            , 'occurrence': sum(file_occurrence_dict.values())
+        }
+        row.update({file_name: file_occurrence_dict.get(file_name, 0) for file_name in text_file_list})
+        result_list.append(row)
+    if count_dict is not None:
+        count_dict.update({
+            'analyse_words': len(word_list)
+            , 'analyse_candidate_pairs': len(pair_list)
+            , 'analyse_correlated_pairs': len(result_list)
+        })
+        if is_sampled:
+            count_dict.update({'analyse_sample_files': sample_files, 'analyse_screened_pairs': screened,
+                               'analyse_unsampled_pairs': unsampled})
+            count_dict.update(get_sample_accuracy(counts, sample_counts, pair_list, min_corr_rate))
+    return pd.DataFrame.from_records(result_list, columns=['word_1', 'word_2', 'correlation', 'file_count', 'occurrence'] + text_file_list)
+
+def write_word_counts(df, output_path, word_counts_columns, file_list, output_format=None):
+    """
+    Write the word counts, in the given format or by the file extension
+    The columnar formats are much faster to read back by the analyse stage than Excel
+    """
+    return output_utils.write_sheets(output_path, [
+        ('word_counts', df, word_counts_columns+file_list, True)
+    ], output_format)
 
 def write_excel_word_counts(df, output_path, word_counts_columns, file_list):
-    with pd.ExcelWriter(output_path) as writer:
-        df.to_excel(writer, sheet_name='word_counts', index=True, columns=word_counts_columns+file_list)
+    return write_word_counts(df, output_path, word_counts_columns, file_list, 'xlsx')
 
-def write_excel_paired_analysis(df, output_path, paired_analysis_columns, file_list):
-    with pd.ExcelWriter(output_path) as writer:
-        df.to_excel(writer, sheet_name='pair_analysis', index=False, columns=paired_analysis_columns+file_list)
+def write_excel_paired_analysis(df, output_path, paired_analysis_columns, file_list, output_format=None):
+    return output_utils.write_sheets(output_path, [
+        ('pair_analysis', df, paired_analysis_columns+file_list, False)
+    ], output_format)
 
-def write_excel_filter_summary(text_pair_list, patterns, output_path):
-    filtered_pair_list = text_pair_list.copy()
+def write_excel_filter_summary(citation_list, output_path, output_format=None):
+    """
+    Write the citations of each filtered sentence, and the summary of each file,
+    from the text pairs and their CitationMatch found by the filter stage
+    """
     result_list = []
-    for line_pair in filtered_pair_list:
-        citations = 0
-        for pattern in patterns:
-            matches = re.findall(pattern, line_pair[1])
-            for match in matches:
-                m1 = re.sub(r',|and', ';', match)
-                citations += len(
-                    [n for n in re.split(r';', m1) 
-                     if n is not None and len(n.strip()) > 0 and
-                        not n.strip().startswith('e.g.') and not n.strip().endswith('e.g.')
-                    ])
+    summary_dict = dict()
+    for line_pair, match_list in citation_list:
+        citations = sum(match.citations for match in match_list)
         result_list.append({
             'filename': line_pair[0],
             'citations': citations,
             'sentence': line_pair[1]
         })
-    df = pd.DataFrame(result_list)
-    df_sum = df.groupby('filename').agg(
-        {'citations': 'sum', 'sentence': 'size'}
-    ).reset_index()
-    with pd.ExcelWriter(output_path) as writer:
-        df.to_excel(writer, sheet_name='citations', index=False)
-        df_sum.to_excel(writer, sheet_name='summary', index=False)
-    
\ No newline at end of file
+        file_summary = summary_dict.setdefault(line_pair[0], [0, 0])
+        file_summary[0] += citations
+        file_summary[1] += 1
+    df = pd.DataFrame(result_list, columns=['filename', 'citations', 'sentence'])
+    df_sum = pd.DataFrame(
+        [[filename] + file_summary for filename, file_summary in sorted(summary_dict.items())],
+        columns=['filename', 'citations', 'sentence']
+    )
+    return output_utils.write_sheets(output_path, [
+        ('citations', df, list(df.columns), False)
+        , ('summary', df_sum, list(df_sum.columns), False)
+    ], output_format)
@@ -0,0 +1,10 @@
+"""
+Test Configuration
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import os
+import sys
+
+# Modules of the program are imported by their names, as the program runs from its directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
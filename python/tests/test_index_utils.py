@@ -0,0 +1,100 @@
+"""
+Index Utilities Tests
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import benchmark
+import index_utils
+import json
+import lang_utils
+import os
+import pandas as pd
+import pytest
+import random
+import re
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+@pytest.fixture(autouse=True)
+def simple_language(monkeypatch):
+    """
+    Replace the nltk tokenizers and the syllable dictionary by simple ones, so that the tests need no nltk data
+    The index is compared with a rebuild under the same language, which is what the tests are about
+    """
+    import nltk
+    import nltk.tokenize
+    monkeypatch.setattr(nltk, 'sent_tokenize', lambda text: [s for s in re.split(r'(?<=\.)\s+', text) if s])
+    monkeypatch.setattr(nltk.tokenize, 'word_tokenize', lambda sentence: re.findall(r'\w+|[^\w\s]', sentence))
+    monkeypatch.setattr(lang_utils, '_syllable_dict', dict())
+
+def write_pdf(pdf_path, seed):
+    """
+    Write a PDF file of random citing sentences over a small vocabulary, so that files share words and pairs
+    """
+    rng = random.Random(seed)
+    vocabulary = benchmark.make_vocabulary(30, random.Random(0))
+    os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+    benchmark.make_pdf(pdf_path, [' '.join(benchmark.make_sentence(rng, vocabulary, 0.8) for _ in range(15))
+                                  for page in range(2)])
+
+def open_index(index_path):
+    with open(CONFIG_PATH, 'r') as fr:
+        config_dict = json.load(fr)
+    settings = index_utils.get_index_settings(None, 'or', config_dict, [])
+    matcher = lang_utils.get_citation_matcher(None, 'or', config_dict['unnamed_patterns'],
+                                              config_dict['named_patterns'], config_dict['named_year_patterns'])
+    return index_utils.open_index(index_path, settings), matcher
+
+def export(conn, out_dir):
+    """
+    Export the index and read back the filtered text, the word counts and the pair analysis in a comparable order
+    """
+    os.makedirs(out_dir)
+    filter_path = os.path.join(out_dir, 'filtered.txt')
+    out_path_list, analysis_path_list = index_utils.export_index(conn, filter_path, os.path.join(out_dir, 'words.csv'),
+                                                                 os.path.join(out_dir, 'analysis.csv'), 0.3, 'csv')
+    with open(filter_path, 'r') as fr:
+        line_list = sorted(fr.read().splitlines())
+    word_df = pd.read_csv(out_path_list[0], index_col='word')
+    word_df = word_df[sorted(word_df.columns)].sort_index()
+    analysis_df = pd.read_csv(analysis_path_list[0])
+    analysis_df = analysis_df[sorted(analysis_df.columns)].sort_values(['word_1', 'word_2']).reset_index(drop=True)
+    return line_list, word_df, analysis_df
+
+def test_incremental_index_matches_rebuild(tmp_path):
+    root_dir = str(tmp_path / 'pdf')
+    path_dict = {name: os.path.join(root_dir, name) for name in ['a.pdf', 'b.pdf', 'c.pdf']}
+    for seed, pdf_path in enumerate(path_dict.values()):
+        write_pdf(pdf_path, seed)
+    conn, matcher = open_index(str(tmp_path / 'index.db'))
+
+    assert index_utils.sync_index(conn, list(path_dict.values()), matcher, [], root_dir=root_dir) == (3, 0, 0)
+    # A single file given without pruning leaves the other files
+    assert index_utils.sync_index(conn, [path_dict['a.pdf']], matcher, [], remove_missing=False, root_dir=root_dir) == (0, 0, 0)
+
+    # Remove a file, change another, then add the removed file back under a subdirectory
+    index_utils.remove_files(conn, ['b.pdf'])
+    moved_path = os.path.join(root_dir, 'sub', 'b.pdf')
+    os.makedirs(os.path.dirname(moved_path))
+    os.replace(path_dict['b.pdf'], moved_path)
+    write_pdf(path_dict['c.pdf'], 10)
+    stat = os.stat(path_dict['c.pdf'])
+    os.utime(path_dict['c.pdf'], (stat.st_atime, stat.st_mtime + 10))
+    path_list = [path_dict['a.pdf'], path_dict['c.pdf'], moved_path]
+    assert index_utils.sync_index(conn, path_list, matcher, [], root_dir=root_dir) == (1, 1, 0)
+    assert index_utils.sync_index(conn, path_list, matcher, [], root_dir=root_dir) == (0, 0, 0)
+    assert sorted(name for name, in conn.execute('SELECT name FROM files')) == ['a.pdf', 'c.pdf', 'sub/b.pdf']
+
+    rebuilt_conn, matcher = open_index(str(tmp_path / 'rebuilt.db'))
+    assert index_utils.sync_index(rebuilt_conn, path_list, matcher, [], root_dir=root_dir) == (3, 0, 0)
+
+    line_list, word_df, analysis_df = export(conn, str(tmp_path / 'incremental'))
+    rebuilt_line_list, rebuilt_word_df, rebuilt_analysis_df = export(rebuilt_conn, str(tmp_path / 'rebuilt'))
+    assert len(analysis_df) > 0
+    assert line_list == rebuilt_line_list
+    pd.testing.assert_frame_equal(word_df, rebuilt_word_df)
+    pd.testing.assert_frame_equal(analysis_df, rebuilt_analysis_df)
+    # Aggregates are those of the remaining files only
+    file_columns = ['a.pdf', 'c.pdf', 'sub/b.pdf']
+    assert (word_df['occurrence'] == word_df[file_columns].sum(axis=1)).all()
+    assert (word_df['file_count'] == (word_df[file_columns] > 0).sum(axis=1)).all()
@@ -0,0 +1,131 @@
+"""
+Statistics Utilities Tests
+@author     Teki Chan
+@since      18 Oct 2026
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import stat_utils
+
+def make_counts(seed=0, words=40, files=12):
+    """
+    Make random word by file counts, with a word in no file and a word of the same count in every file
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(0.8, size=(words, files)) * (rng.random((words, files)) < 0.5)
+    counts[0] = 0
+    counts[1] = 2
+    return pd.DataFrame(counts, index=['w{i:02d}'.format(i=i) for i in range(words)],
+                        columns=['f{j:02d}.pdf'.format(j=j) for j in range(files)])
+
+def make_text_pairs(df, seed=0, sentences=200):
+    """
+    Make sentences of random words of the counts, so that adjacent words become pairs
+    """
+    rng = np.random.default_rng(seed)
+    word_list = list(df.index)
+    text_pair_list = list()
+    for idx in range(sentences):
+        file_name = df.columns[idx % len(df.columns)]
+        text_pair_list.append([file_name, ' '.join(rng.choice(word_list, size=6))])
+    return text_pair_list
+
+@pytest.mark.parametrize('lookup_size', [stat_utils.LOOKUP_SIZE, 7])
+def test_pair_correlations_match_pandas(monkeypatch, lookup_size):
+    monkeypatch.setattr(stat_utils, 'LOOKUP_SIZE', lookup_size)
+    df = make_counts()
+    file_list = list(df.columns)
+    sparse_df = df.astype(pd.SparseDtype('int64', 0))
+    counts = stat_utils.SparseCounts.from_dataframe(sparse_df, file_list)
+    pair_array = np.array([(i, j) for i in range(len(df)) for j in range(i + 1, len(df))], dtype=np.int64)
+
+    corr_rates, is_together = counts.get_pair_correlations(pair_array)
+
+    expected_df = df.T.corr()
+    expected_rates = expected_df.to_numpy()[pair_array[:, 0], pair_array[:, 1]]
+    np.testing.assert_allclose(corr_rates, expected_rates, rtol=0, atol=1e-9, equal_nan=True)
+    # Words without variance have no correlation
+    assert np.isnan(corr_rates[(pair_array[:, 0] == 0) | (pair_array[:, 1] == 1)]).all()
+    values = df.to_numpy()
+    expected_together = ((values[pair_array[:, 0]] > 0) & (values[pair_array[:, 1]] > 0)).any(axis=1)
+    np.testing.assert_array_equal(is_together, expected_together)
+
+def test_select_columns_match_pandas():
+    df = make_counts(seed=1)
+    file_list = list(df.columns)
+    counts = stat_utils.SparseCounts.from_dataframe(df, file_list)
+    col_array = np.array([7, 2, 9, 0])
+    pair_array = np.array([(i, j) for i in range(len(df)) for j in range(i + 1, len(df))], dtype=np.int64)
+
+    corr_rates = counts.select_columns(col_array).get_pair_correlations(pair_array)[0]
+
+    expected_rates = df.iloc[:, col_array].T.corr().to_numpy()[pair_array[:, 0], pair_array[:, 1]]
+    np.testing.assert_allclose(corr_rates, expected_rates, rtol=0, atol=1e-9, equal_nan=True)
+
+def get_expected_pairs(df, text_pair_list, min_corr_rate, min_occurrence=None, min_files=None):
+    """
+    Get the correlation of each pair of adjacent words correlated at least the rate, by pandas on dense counts
+    """
+    values = df.to_numpy()
+    is_kept = (values.sum(axis=1) >= (min_occurrence or 0)) & ((values > 0).sum(axis=1) >= (min_files or 0))
+    kept_df = df[is_kept]
+    word_pos_dict = {word: pos for pos, word in enumerate(kept_df.index)}
+    corr_df = kept_df.T.corr()
+    kept_values = kept_df.to_numpy()
+    expected_dict = dict()
+    for pair in stat_utils.build_pair_index(text_pair_list, word_pos_dict):
+        corr_rate = corr_df.iat[pair[0], pair[1]]
+        is_together = ((kept_values[pair[0]] > 0) & (kept_values[pair[1]] > 0)).any()
+        if is_together and corr_rate >= min_corr_rate:
+            expected_dict[(kept_df.index[pair[0]], kept_df.index[pair[1]])] = corr_rate
+    return expected_dict
+
+def get_result_dict(paired_df):
+    return {(row.word_1, row.word_2): row.correlation for row in paired_df.itertuples()}
+
+@pytest.mark.parametrize('min_occurrence, min_files', [(None, None), (3, None), (None, 4), (4, 3)])
+def test_analyse_pair_matches_pandas(min_occurrence, min_files):
+    df = make_counts(seed=2)
+    file_list = list(df.columns)
+    text_pair_list = make_text_pairs(df, seed=2)
+
+    paired_df = stat_utils.analyse_pair(df.astype(pd.SparseDtype('int64', 0)), file_list, 0.1, text_pair_list,
+                                        chunk_size=50, min_occurrence=min_occurrence, min_files=min_files)
+
+    expected_dict = get_expected_pairs(df, text_pair_list, 0.1, min_occurrence, min_files)
+    result_dict = get_result_dict(paired_df)
+    assert len(expected_dict) > 0
+    assert set(result_dict) == set(expected_dict)
+    for pair, corr_rate in expected_dict.items():
+        assert result_dict[pair] == pytest.approx(corr_rate, abs=1e-9)
+
+@pytest.mark.parametrize('top_k', [1, 5, 1000])
+def test_analyse_pair_top_k(top_k):
+    df = make_counts(seed=3)
+    file_list = list(df.columns)
+    text_pair_list = make_text_pairs(df, seed=3)
+
+    paired_df = stat_utils.analyse_pair(df, file_list, 0.05, text_pair_list, chunk_size=20, top_k=top_k, min_files=2)
+
+    expected_dict = get_expected_pairs(df, text_pair_list, 0.05, min_files=2)
+    expected_rates = sorted(expected_dict.values(), reverse=True)[:top_k]
+    assert len(paired_df) == len(expected_rates)
+    np.testing.assert_allclose(paired_df['correlation'].to_numpy(), expected_rates, rtol=0, atol=1e-9)
+    for pair, corr_rate in get_result_dict(paired_df).items():
+        assert expected_dict[pair] == pytest.approx(corr_rate, abs=1e-9)
+
+def test_analyse_pair_sampled_is_exact():
+    df = make_counts(seed=4)
+    file_list = list(df.columns)
+    text_pair_list = make_text_pairs(df, seed=4)
+    count_dict = dict()
+
+    paired_df = stat_utils.analyse_pair(df, file_list, 0.3, text_pair_list, sample_files=8, count_dict=count_dict)
+
+    # The pairs passing the screen are evaluated exactly on all files
+    expected_dict = get_expected_pairs(df, text_pair_list, 0.3)
+    for pair, corr_rate in get_result_dict(paired_df).items():
+        assert expected_dict[pair] == pytest.approx(corr_rate, abs=1e-9)
+    assert count_dict['analyse_sample_files'] == 8
+    assert count_dict['analyse_screened_pairs'] <= count_dict['analyse_candidate_pairs']